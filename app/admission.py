@@ -0,0 +1,119 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from app.config import settings
+
+class Rejected(Exception):
+    """Raised when a webhook is not admitted. `result` is the webhook_requests_total outcome."""
+
+    def __init__(self, status_code: int, result: str, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.result = result
+        self.detail = detail
+        self.retry_after = retry_after
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+class AdmissionController:
+    """
+    Admission control for the webhook write path:
+    - a token bucket per sender (rate tokens/s, up to burst), kept in a bounded LRU
+    - at most max_concurrency writes in flight, with up to max_queue waiting;
+      anything beyond that is shed immediately instead of piling up on the loop
+    """
+
+    def __init__(self, rate: float, burst: int, max_senders: int, max_concurrency: int, max_queue: int, retry_after: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_senders = max_senders
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._in_flight = 0
+        self._waiters: deque = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def check_sender(self, sender: str):
+        """Takes one token from the sender's bucket or raises Rejected (429)."""
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[sender] = bucket
+            if len(self._buckets) > self.max_senders:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(sender)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens < 1:
+            retry_after = max(1, math.ceil((1 - bucket.tokens) / self.rate))
+            raise Rejected(429, "throttled", "rate limit exceeded", retry_after)
+        bucket.tokens -= 1
+
+    async def acquire(self):
+        """Waits for a write slot, or raises Rejected (503) when the queue is full."""
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected(503, "shed", "server overloaded", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over by resolving the future
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # The slot was handed over just before cancellation
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def write_slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+admission = AdmissionController(
+    rate=settings.RATE_LIMIT_PER_SENDER,
+    burst=settings.RATE_LIMIT_BURST,
+    max_senders=settings.RATE_LIMIT_MAX_SENDERS,
+    max_concurrency=settings.WEBHOOK_MAX_CONCURRENCY,
+    max_queue=settings.WEBHOOK_MAX_QUEUE,
+    retry_after=settings.WEBHOOK_RETRY_AFTER_S
+)
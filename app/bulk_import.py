@@ -0,0 +1,192 @@
+"""
+Offline bulk loader for backfilling messages.
+
+    python -m app.bulk_import messages.ndjson [more.csv.gz ...]
+
+Rows are validated with the same WebhookRequest rules as POST /webhook and
+inserted in large transactions. The import is idempotent on message_id:
+re-running it counts already-stored rows as duplicates. Secondary indexes on
+`messages` are dropped for the load and rebuilt afterwards, so run it while
+the API is stopped, and take a backup of the database first.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from collections import Counter
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from app.models import WebhookRequest
+from app.storage import bucket_start, get_db_connection, increment_rollups, init_db, insert_message_row, now_iso
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.read / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "rows_per_s": round(self.rows_per_s, 1),
+        }
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    raise ValueError(f"cannot detect format of {path}, pass --format")
+
+def open_input(path: str) -> TextIO:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yields (line number, row, parse error) without loading the file into memory."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # CSV cannot tell a missing text from an empty one
+            if row.get("text") == "":
+                row["text"] = None
+            yield reader.line_num, row, None
+        return
+
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield line_num, None, f"invalid JSON: {e.msg}"
+
+def drop_secondary_indexes(conn) -> List[str]:
+    """Drops the explicitly created indexes on messages and returns their SQL."""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'messages' AND sql IS NOT NULL"
+    ).fetchall()
+    for row in rows:
+        conn.execute(f'DROP INDEX "{row["name"]}"')
+    conn.commit()
+    return [row["sql"] for row in rows]
+
+def flush_batch(conn, batch: List[WebhookRequest], stats: ImportStats):
+    created_at = now_iso()
+    rollups: Counter = Counter()
+    for msg in batch:
+        if insert_message_row(conn, msg, created_at):
+            stats.inserted += 1
+            rollups[(msg.from_, bucket_start(msg.ts, "minute"))] += 1
+        else:
+            stats.duplicates += 1
+    # One rollup upsert per (sender, minute) instead of one per row
+    for (from_msisdn, minute), count in rollups.items():
+        increment_rollups(conn, from_msisdn, minute, count)
+    conn.commit()
+
+def import_files(paths: List[str], fmt: Optional[str] = None, batch_size: int = 50000,
+                 keep_indexes: bool = False, progress_every: int = 100000,
+                 max_errors_shown: int = 10, out: TextIO = sys.stderr) -> ImportStats:
+    init_db()
+    stats = ImportStats()
+    conn = get_db_connection()
+    try:
+        # In WAL mode NORMAL only syncs at checkpoints, which is cheap with large
+        # transactions. Unlike OFF it cannot corrupt the database on an OS crash
+        # or power loss; at worst the last batches are lost and re-run idempotently.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")
+
+        index_sql = [] if keep_indexes else drop_secondary_indexes(conn)
+        try:
+            batch: List[WebhookRequest] = []
+            for path in paths:
+                with open_input(path) as stream:
+                    for line_num, row, error in read_rows(stream, fmt or detect_format(path)):
+                        stats.read += 1
+                        if error is None:
+                            try:
+                                batch.append(WebhookRequest.model_validate(row))
+                            except ValidationError as e:
+                                error = "; ".join(
+                                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                                )
+                        if error is not None:
+                            stats.invalid += 1
+                            if stats.invalid <= max_errors_shown:
+                                print(f"{path}:{line_num}: {error}", file=out)
+
+                        if len(batch) >= batch_size:
+                            flush_batch(conn, batch, stats)
+                            batch = []
+                        if progress_every and stats.read % progress_every == 0:
+                            print(f"progress: {stats.read} rows, {stats.rows_per_s:.0f} rows/s", file=out)
+            if batch:
+                flush_batch(conn, batch, stats)
+        finally:
+            if index_sql:
+                print(f"rebuilding {len(index_sql)} index(es)", file=out)
+                for sql in index_sql:
+                    conn.execute(sql)
+                conn.commit()
+    finally:
+        conn.close()
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bulk_import", description="Bulk-load messages from NDJSON/CSV files.")
+    parser.add_argument("paths", nargs="+", help="input files (.ndjson/.jsonl/.csv, optionally .gz); - reads stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="rows per transaction")
+    parser.add_argument("--keep-indexes", action="store_true", help="don't drop secondary indexes during the load")
+    parser.add_argument("--progress-every", type=int, default=100000, help="print progress every N rows (0 disables)")
+    parser.add_argument("--max-errors-shown", type=int, default=10, help="invalid rows to report individually")
+    args = parser.parse_args(argv)
+
+    if not args.format:
+        for path in args.paths:
+            if path == "-":
+                parser.error("--format is required when reading stdin")
+            try:
+                detect_format(path)
+            except ValueError as e:
+                parser.error(str(e))
+
+    stats = import_files(
+        args.paths,
+        fmt=args.format,
+        batch_size=args.batch_size,
+        keep_indexes=args.keep_indexes,
+        progress_every=args.progress_every,
+        max_errors_shown=args.max_errors_shown
+    )
+    print(json.dumps(stats.summary()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
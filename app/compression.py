@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.metrics import metrics
+
+# Optional codecs: used when installed, otherwise only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 keeps the output deterministic for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def _brotli(data: bytes, level: int) -> bytes:
+    # brotli quality runs 0-11, gzip levels 1-9
+    return brotli.compress(data, quality=min(level + 2, 11))
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+# Content-Encoding token -> compressor, in server preference order
+ENCODERS: Dict[str, Callable[[bytes, int], bytes]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+ENCODERS["gzip"] = _gzip
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the best supported encoding from an Accept-Encoding header.
+    Highest q-value wins; ties go to server preference (ENCODERS order).
+    Returns None when the identity encoding should be used.
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _variant_etag(etag: str, encoding: Optional[str]) -> str:
+    # Each encoded representation gets its own strong validator
+    if encoding is None:
+        return etag
+    return etag[:-1] + "-" + encoding + '"'
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    Checks If-None-Match against the identity ETag and all encoded variants.
+    Returns the matched tag (the identity ETag for "*"), or None.
+    """
+    if not if_none_match:
+        return None
+    candidates = {etag} | {_variant_etag(etag, encoding) for encoding in ENCODERS}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in candidates:
+            return tag
+    return None
+
+def compress(body: bytes, encoding: str) -> Tuple[bytes, float]:
+    """Returns the compressed body and the time it took in ms."""
+    start = time.perf_counter()
+    compressed = ENCODERS[encoding](body, settings.COMPRESSION_LEVEL)
+    return compressed, (time.perf_counter() - start) * 1000
+
+def _headers(etag: str, encoding: Optional[str], extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+    headers = {"ETag": _variant_etag(etag, encoding), "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if extra:
+        headers.update(extra)
+    return headers
+
+async def encoded_response(request: Request, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Builds a response for a dynamic body with an ETag, If-None-Match handling
+    and negotiated compression. Large bodies are compressed in the threadpool.
+    """
+    etag = make_etag(body)
+
+    # A 304 echoes the validator the client holds, so nothing is compressed
+    matched = matching_etag(request.headers.get("if-none-match"), etag)
+    if matched is not None:
+        not_modified = {"ETag": matched, "Vary": "Accept-Encoding"}
+        if headers:
+            not_modified.update(headers)
+        return Response(status_code=304, headers=not_modified)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        encoding = None
+
+    if encoding is not None:
+        if len(body) >= settings.COMPRESSION_OFFLOAD_SIZE:
+            compressed, duration_ms = await run_in_threadpool(compress, body, encoding)
+        else:
+            compressed, duration_ms = compress(body, encoding)
+        if len(compressed) < len(body):
+            # Counted only when the compressed body is actually sent
+            metrics.observe_compression(encoding, len(body) - len(compressed), duration_ms)
+            body = compressed
+        else:
+            encoding = None
+
+    return Response(content=body, media_type=media_type, headers=_headers(etag, encoding, headers))
+
+class PrecompressedAsset:
+    """
+    A static body compressed once with every available encoder, served with a
+    stable ETag and long-lived caching headers.
+    """
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str = "public, max-age=86400"):
+        self.body = body
+        self.media_type = media_type
+        self.etag = make_etag(body)
+        self.cache_headers = {"Cache-Control": cache_control}
+        self.variants: Dict[str, bytes] = {}
+        for encoding, encoder in ENCODERS.items():
+            compressed = encoder(body, 9)
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+    def response(self, request: Request) -> Response:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding not in self.variants:
+            encoding = None
+        headers = _headers(self.etag, encoding, self.cache_headers)
+
+        if matching_etag(request.headers.get("if-none-match"), self.etag) is not None:
+            return Response(status_code=304, headers=headers)
+
+        if encoding is None:
+            return Response(content=self.body, media_type=self.media_type, headers=headers)
+
+        body = self.variants[encoding]
+        metrics.observe_compression(encoding, len(self.body) - len(body))
+        return Response(content=body, media_type=self.media_type, headers=headers)
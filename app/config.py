@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +7,56 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     LOG_LEVEL: str = "INFO"
 
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_LEVEL: int = 6
+    # Bodies at least this large are compressed in the threadpool, off the event loop
+    COMPRESSION_OFFLOAD_SIZE: int = 65536
+
+    # Webhook admission control
+    # Sustained messages/second allowed per sender, with bursts up to RATE_LIMIT_BURST.
+    # Off by default (0): high-volume senders such as OTP shortcodes would be throttled.
+    RATE_LIMIT_PER_SENDER: float = 0.0
+    RATE_LIMIT_BURST: int = 100
+    RATE_LIMIT_MAX_SENDERS: int = 100000
+    # Concurrent writes to SQLite, and how many more may wait before being shed
+    WEBHOOK_MAX_CONCURRENCY: int = 2
+    WEBHOOK_MAX_QUEUE: int = 256
+    WEBHOOK_RETRY_AFTER_S: int = 1
+
+    # Store new message text zstd-compressed with the latest trained dictionary
+    # (needs the zstandard package; see python -m app.text_compression)
+    TEXT_COMPRESSION: bool = False
+    TEXT_COMPRESSION_LEVEL: int = 3
+
+    # Read query time budgets in milliseconds (0 disables); enforced inside SQLite
+    QUERY_BUDGET_MESSAGES_MS: int = 2000
+    QUERY_BUDGET_STATS_MS: int = 5000
+    QUERY_BUDGET_TIMESERIES_MS: int = 1000
+    QUERY_BUDGET_CONVERSATIONS_MS: int = 1000
+
+    # Background health checks backing /health/ready
+    HEALTH_CHECK_INTERVAL_S: float = 5.0
+    # Cached results older than this make the service unready
+    HEALTH_MAX_STALENESS_S: float = 30.0
+    HEALTH_LOCK_TIMEOUT_MS: int = 1000
+    HEALTH_MIN_FREE_BYTES: int = 100 * 1024 * 1024
+
+    # Startup warmup and shutdown drain
+    WARMUP_ENABLED: bool = True
+    # Rows ANALYZE samples per index during warmup
+    WARMUP_ANALYZE_LIMIT: int = 1000
+    # Most recent conversations whose index pages and threads warmup reads
+    WARMUP_RECENT_CONVERSATIONS: int = 50
+    # Passed to uvicorn as timeout_graceful_shutdown by app.serve
+    SHUTDOWN_DRAIN_TIMEOUT_S: float = 10.0
+
+    # Profiling: profile 1 in N requests (0 disables). /admin endpoints need ADMIN_TOKEN.
+    PROFILE_SAMPLE_RATE: int = 0
+    # Stack snapshot interval while a sampled request is in flight
+    PROFILE_INTERVAL_MS: float = 5.0
+    ADMIN_TOKEN: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.admission import admission
+from app.config import settings
+from app.metrics import metrics
+from app.storage import get_db_connection, get_db_path
+
+logger = logging.getLogger("api")
+
+def _timed(probe) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        result = probe()
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+def _probe_select() -> Dict[str, Any]:
+    conn = get_db_connection()
+    try:
+        conn.execute("SELECT 1").fetchone()
+        return {"ok": True}
+    finally:
+        conn.close()
+
+def _probe_write_lock() -> Dict[str, Any]:
+    # Acquire and release the write lock without writing anything
+    conn = get_db_connection()
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {settings.HEALTH_LOCK_TIMEOUT_MS}")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.rollback()
+        return {"ok": True}
+    finally:
+        conn.close()
+
+def _probe_disk_free() -> Dict[str, Any]:
+    directory = os.path.dirname(os.path.abspath(get_db_path()))
+    free = shutil.disk_usage(directory).free
+    return {"ok": free >= settings.HEALTH_MIN_FREE_BYTES, "free_bytes": free}
+
+def run_probes(queue_depth: int) -> Dict[str, Dict[str, Any]]:
+    """Runs the blocking probes. Called from the threadpool."""
+    return {
+        "select": _timed(_probe_select),
+        "write_lock": _timed(_probe_write_lock),
+        "disk_free": _timed(_probe_disk_free),
+        # Shedding starts once the writer queue is full
+        "writer_queue": {"ok": queue_depth < admission.max_queue, "depth": queue_depth, "latency_ms": 0.0},
+    }
+
+class HealthChecker:
+    """
+    Runs cheap readiness probes on an interval and caches the result, so
+    /health/ready never touches the database itself.
+    """
+
+    def __init__(self):
+        self.result: Optional[Dict[str, Any]] = None
+        self._checked_at_monotonic = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        # Queue depth is loop state, read it here rather than in the threadpool
+        probes = await run_in_threadpool(run_probes, admission.queue_depth)
+        for name, probe in probes.items():
+            metrics.set_health_probe(name, probe["ok"], probe["latency_ms"])
+
+        self.result = {
+            "ok": all(probe["ok"] for probe in probes.values()),
+            "checked_at": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "probes": probes,
+        }
+        self._checked_at_monotonic = time.monotonic()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL_S)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Tuple[bool, str]:
+        """Readiness from the cached result: (ready, reason)."""
+        if self.result is None:
+            return False, "health not checked yet"
+        if time.monotonic() - self._checked_at_monotonic > settings.HEALTH_MAX_STALENESS_S:
+            return False, "health check stale"
+        if not self.result["ok"]:
+            failing = [name for name, probe in self.result["probes"].items() if not probe["ok"]]
+            return False, "failing probes: " + ", ".join(failing)
+        return True, "ok"
+
+health = HealthChecker()
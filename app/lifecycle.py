@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.admission import Rejected
+from app.config import settings
+from app.health import health
+from app.models import WebhookRequest, MessageListResponse, StatsResponse
+from app.serialization import render_message_list
+from app.storage import ALL_SENDERS, ROLLUP_BUCKETS, get_db_connection, init_db
+from app.text_codec import codec
+
+logger = logging.getLogger("api")
+
+def read_hot_pages(conn):
+    """
+    Reads the ranges the first requests start from, so their pages are in the
+    OS page cache (which outlives this connection): the tail of
+    idx_conversations_last_ts and its rows, the threads of those recent
+    conversations via idx_messages_pair_ts, and the newest all-senders
+    rollup buckets.
+    """
+    pairs = [row[0] for row in conn.execute(
+        "SELECT pair FROM conversations INDEXED BY idx_conversations_last_ts "
+        "ORDER BY last_ts DESC, pair DESC LIMIT ?", (settings.WARMUP_RECENT_CONVERSATIONS,)
+    )]
+    conn.execute(
+        "SELECT * FROM conversations ORDER BY last_ts DESC, pair DESC LIMIT ?", (settings.WARMUP_RECENT_CONVERSATIONS,)
+    ).fetchall()
+    for pair in pairs:
+        conn.execute(
+            "SELECT * FROM messages WHERE pair = ? ORDER BY ts DESC, message_id DESC LIMIT 100", (pair,)
+        ).fetchall()
+    for table, _ in ROLLUP_BUCKETS.values():
+        conn.execute(
+            f"SELECT * FROM {table} WHERE from_msisdn = ? ORDER BY bucket_start DESC LIMIT 1000", (ALL_SENDERS,)
+        ).fetchall()
+
+def warmup():
+    """
+    Pays first-request costs up front: refreshes planner statistics, reads the
+    hot index ranges into the OS page cache, loads compression dictionaries
+    and runs the validators and serializers once.
+    """
+    conn = get_db_connection()
+    try:
+        # Bounded ANALYZE: samples at most WARMUP_ANALYZE_LIMIT rows per index
+        conn.execute(f"PRAGMA analysis_limit = {settings.WARMUP_ANALYZE_LIMIT}")
+        conn.execute("ANALYZE")
+        conn.commit()
+        read_hot_pages(conn)
+        codec.refresh(conn)
+    finally:
+        conn.close()
+
+    sample = WebhookRequest.model_validate({
+        "message_id": "warmup", "from": "+10000000000", "to": "+10000000001",
+        "ts": "2025-01-01T00:00:00Z", "text": "warmup"
+    })
+    render_message_list([(sample.message_id, sample.from_, sample.to, sample.ts, sample.text)], 1, 50, 0)
+    MessageListResponse(data=[], total=0, limit=50, offset=0)
+    StatsResponse(total_messages=0, senders_count=0, messages_per_sender=[], first_message_ts=None, last_message_ts=None)
+
+class Lifecycle:
+    """
+    Startup and shutdown sequencing. The service reports ready only after
+    warmup. Draining starts on the shutdown signal (see app.serve): webhooks
+    are rejected from then on while in-flight writes finish. The lifespan
+    shutdown then checkpoints the WAL.
+    """
+
+    def __init__(self):
+        self.state = "starting"
+        self.startup_ms: Optional[float] = None
+        self._writes_in_flight = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def writes_in_flight(self) -> int:
+        return self._writes_in_flight
+
+    @contextmanager
+    def write_guard(self):
+        """Tracks a webhook write; raises Rejected (503) once shutdown has begun."""
+        if self.state in ("draining", "stopped"):
+            raise Rejected(503, "draining", "shutting down", settings.WEBHOOK_RETRY_AFTER_S)
+        self._writes_in_flight += 1
+        try:
+            yield
+        finally:
+            self._writes_in_flight -= 1
+
+    async def startup(self, app):
+        self.state = "starting"
+        start = time.perf_counter()
+
+        await run_in_threadpool(init_db)
+        await run_in_threadpool(check_text_codec)
+        if settings.WARMUP_ENABLED:
+            await run_in_threadpool(warmup)
+            # Builds and caches every model's JSON schema
+            app.openapi()
+        await health.refresh()
+        health.start()
+
+        self.startup_ms = round((time.perf_counter() - start) * 1000, 3)
+        self.state = "ready"
+        logger.info(f"Startup complete in {self.startup_ms} ms")
+
+    def begin_drain(self):
+        """Stops admitting webhooks and reports not ready. Safe to call more than once."""
+        if self.state in ("starting", "ready"):
+            self.state = "draining"
+            logger.info(f"Draining, {self._writes_in_flight} writes in flight")
+
+    async def shutdown(self):
+        # Normally a no-op wait: the server has already drained in-flight
+        # requests by the time the lifespan shutdown runs
+        self.begin_drain()
+        deadline = time.monotonic() + settings.SHUTDOWN_DRAIN_TIMEOUT_S
+        while self._writes_in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        if self._writes_in_flight:
+            logger.warning(f"Drain deadline reached with {self._writes_in_flight} writes in flight")
+
+        await health.stop()
+        try:
+            await run_in_threadpool(checkpoint_wal)
+        except Exception as e:
+            logger.error(f"WAL checkpoint failed: {e}")
+        self.state = "stopped"
+
+def check_text_codec():
+    conn = get_db_connection()
+    try:
+        codec.check(conn)
+    finally:
+        conn.close()
+
+def checkpoint_wal():
+    conn = get_db_connection()
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+lifecycle = Lifecycle()
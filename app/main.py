@@ -1,25 +1,43 @@
+import asyncio
 import hmac
 import hashlib
-import time
-import uuid
 import logging
 from contextlib import asynccontextmanager
 from typing import Optional, Annotated
 
 from fastapi import FastAPI, HTTPException, Request, Response, Header, Depends, Query, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse, PlainTextResponse, HTMLResponse
 from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
-from app.models import WebhookRequest, MessageListResponse
-from app.storage import init_db, insert_message, get_messages as db_get_messages, get_stats as db_get_stats
+from app.models import (
+    WebhookRequest, MessageListResponse, StatsResponse, TimeseriesResponse,
+    ConversationThreadResponse, ConversationListResponse, parse_utc_timestamp
+)
+from app.storage import (
+    insert_message, get_message_rows as db_get_message_rows, get_stats as db_get_stats,
+    get_timeseries as db_get_timeseries, get_conversation_rows as db_get_conversation_rows,
+    get_recent_conversations as db_get_recent_conversations, conversation_pair, QueryBudget, QueryCancelled
+)
 from app.logging_utils import setup_logging
 from app.metrics import metrics
+from app.admission import admission, Rejected
+from app.health import health
+from app.lifecycle import lifecycle
+from app.middleware import RequestLoggingMiddleware
+from app.profiling import ProfilingMiddleware, profiler, start_tracemalloc, stop_tracemalloc, tracemalloc_top
+from app.serialization import render_json, render_message_list, render_thread, encode_cursor, decode_cursor
+from app.compression import PrecompressedAsset, encoded_response
 from app.ui import dashboard_html
 
 # Setup Logging
 logger = setup_logging(settings.LOG_LEVEL)
 
+# Dashboard is static: compress it once at import
+dashboard = PrecompressedAsset(dashboard_html.encode("utf-8"), "text/html")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -28,58 +46,59 @@ async def lifespan(app: FastAPI):
         raise RuntimeError("WEBHOOK_SECRET env var is required")
     
     logger.info("Starting up...")
-    init_db()
+    await lifecycle.startup(app)
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await lifecycle.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
-# Middleware for structured logging and metrics
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-    
-    start_time = time.time()
-    
+# Request ids, metrics and access logging (pure ASGI)
+app.add_middleware(RequestLoggingMiddleware)
+
+# Sampling profiler wraps the logging middleware; not installed at all when disabled
+if profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None):
+    # Admin endpoints don't exist unless a token is configured
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+async def _cancel_on_disconnect(request: Request, budget: QueryBudget):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            budget.cancel()
+            return
+
+async def run_query(request: Request, timeout_ms: int, query, *args):
+    """
+    Runs a blocking storage query in the threadpool under a time budget.
+    The query is interrupted if the budget runs out or the client disconnects.
+    """
+    budget = QueryBudget(timeout_ms)
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, budget))
     try:
-        response = await call_next(request)
-        status_code = response.status_code
-    except Exception as exc:
-        # Unhandled exception
-        logger.error(f"Unhandled exception: {exc}")
-        status_code = 500
-        response = JSONResponse(content={"detail": "Internal Server Error"}, status_code=500)
-    
-    duration = (time.time() - start_time) * 1000
-    
-    # Update metrics
-    metrics.inc_http_request(request.url.path, str(status_code))
-    metrics.observe_latency(duration)
-    
-    # Log
-    extra = {
-        "request_id": request_id,
-        "method": request.method,
-        "path": request.url.path,
-        "status": status_code,
-        "latency_ms": round(duration, 3)
-    }
-    
-    # Add webhook specific log fields if set in request state
-    if hasattr(request.state, "webhook_log_extra"):
-        extra.update(request.state.webhook_log_extra)
-        
-    logger.info("Request finished", extra=extra)
-    
-    return response
+        return await run_in_threadpool(query, *args, budget=budget)
+    finally:
+        watcher.cancel()
+
+def query_cancelled(endpoint: str, e: QueryCancelled) -> HTTPException:
+    metrics.inc_query_cancelled(endpoint, e.reason)
+    logger.warning(f"Query cancelled on {endpoint}: {e.reason}")
+    if e.reason == "timeout":
+        return HTTPException(status_code=504, detail="query time budget exceeded")
+    return HTTPException(status_code=503, detail="query cancelled")
 
 # Routes
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    return dashboard_html
+async def root(request: Request):
+    return dashboard.response(request)
 
 @app.post("/webhook")
 async def webhook(
@@ -120,8 +139,21 @@ async def webhook(
         request.state.webhook_log_extra = {"result": "validation_error"}
         return JSONResponse(status_code=422, content={"detail": "Invalid JSON"})
 
-    # 4. Idempotency & Persistence
-    inserted = insert_message(webhook_req)
+    # 4. Admission control, then Idempotency & Persistence
+    # The insert runs in the threadpool so a slow SQLite write never blocks the loop
+    try:
+        with lifecycle.write_guard():
+            admission.check_sender(webhook_req.from_)
+            async with admission.write_slot():
+                inserted = await run_in_threadpool(insert_message, webhook_req)
+    except Rejected as e:
+        metrics.inc_webhook_request(e.result)
+        request.state.webhook_log_extra = {"message_id": webhook_req.message_id, "result": e.result}
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": e.detail},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     
     if inserted:
         result = "created"
@@ -138,8 +170,9 @@ async def webhook(
     
     return {"status": "ok"}
 
-@app.get("/messages")
+@app.get("/messages", response_model=MessageListResponse)
 async def list_messages(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     from_: Optional[str] = Query(None, alias="from"),
@@ -147,26 +180,115 @@ async def list_messages(
     q: Optional[str] = None
 ):
     try:
-        data, total = db_get_messages(limit, offset, from_, since, q)
-        return MessageListResponse(
-            data=data,
-            total=total,
-            limit=limit,
-            offset=offset
-        )
+        # Fast path: render JSON straight from tuple rows (same bytes as MessageListResponse)
+        rows, total = await run_query(request, settings.QUERY_BUDGET_MESSAGES_MS, db_get_message_rows, limit, offset, from_, since, q)
+        body = render_message_list(rows, total, limit, offset)
+    except QueryCancelled as e:
+        raise query_cancelled("/messages", e)
     except Exception as e:
         logger.error(f"Error fetching messages: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@app.get("/stats")
-async def get_stats_endpoint():
+    return await encoded_response(request, body, "application/json")
+
+@app.get("/stats", response_model=StatsResponse)
+async def get_stats_endpoint(request: Request):
     try:
-        stats = db_get_stats()
-        return stats
+        stats = await run_query(request, settings.QUERY_BUDGET_STATS_MS, db_get_stats)
+        body = render_json(jsonable_encoder(stats))
+    except QueryCancelled as e:
+        raise query_cancelled("/stats", e)
     except Exception as e:
         logger.error(f"Error fetching stats: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    return await encoded_response(request, body, "application/json")
+
+@app.get("/stats/timeseries", response_model=TimeseriesResponse)
+async def get_timeseries_endpoint(
+    request: Request,
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    from_: Optional[str] = Query(None, alias="from"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    for name, value in (("since", since), ("until", until)):
+        if value is not None:
+            try:
+                parse_utc_timestamp(value)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=f"{name}: {e}")
+    try:
+        timeseries = await run_query(request, settings.QUERY_BUDGET_TIMESERIES_MS, db_get_timeseries, bucket, from_, since, until, limit)
+        body = render_json(jsonable_encoder(timeseries))
+    except QueryCancelled as e:
+        raise query_cancelled("/stats/timeseries", e)
+    except Exception as e:
+        logger.error(f"Error fetching timeseries: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    return await encoded_response(request, body, "application/json")
+
+def parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, 2)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+@app.get("/conversations", response_model=ConversationListResponse)
+async def list_conversations(
+    request: Request,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    before = parse_cursor(cursor)
+    try:
+        # Fetch one extra row to know whether there is a next page
+        conversations = await run_query(request, settings.QUERY_BUDGET_CONVERSATIONS_MS, db_get_recent_conversations, limit + 1, before)
+    except QueryCancelled as e:
+        raise query_cancelled("/conversations", e)
+    except Exception as e:
+        logger.error(f"Error fetching conversations: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.last_ts, conversation_pair(last.participant_a, last.participant_b))
+
+    body = render_json(jsonable_encoder(ConversationListResponse(data=conversations, next_cursor=next_cursor)))
+    return await encoded_response(request, body, "application/json")
+
+@app.get("/conversations/{a}/{b}", response_model=ConversationThreadResponse)
+async def get_conversation(
+    request: Request,
+    a: str,
+    b: str,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    after = parse_cursor(cursor)
+    try:
+        # Fetch one extra row to know whether there is a next page
+        rows = await run_query(request, settings.QUERY_BUDGET_CONVERSATIONS_MS, db_get_conversation_rows, a, b, limit + 1, after)
+    except QueryCancelled as e:
+        raise query_cancelled("/conversations/{a}/{b}", e)
+    except Exception as e:
+        logger.error(f"Error fetching conversation: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        message_id, _, _, ts, _ = rows[-1]
+        next_cursor = encode_cursor(ts, message_id)
+
+    return await encoded_response(request, render_thread(rows, next_cursor), "application/json")
+
 @app.get("/health/live")
 async def health_live():
     return {"status": "ok"}
@@ -176,14 +298,46 @@ async def health_ready():
     # Check DB and Secret
     if not settings.WEBHOOK_SECRET:
         raise HTTPException(status_code=503, detail="Secret not set")
-    try:
-        # Simple DB check
-        db_get_stats()
-    except Exception:
-        raise HTTPException(status_code=503, detail="Database not ready")
-        
-    return {"status": "ok"}
+    if not lifecycle.ready:
+        raise HTTPException(status_code=503, detail=lifecycle.state)
+
+    # Answered from the background checker's cache
+    ready, reason = health.status()
+    if not ready:
+        raise HTTPException(status_code=503, detail=reason)
+
+    return {"status": "ok", "checked_at": health.result["checked_at"]}
 
 @app.get("/metrics")
 async def metrics_endpoint():
     return PlainTextResponse(metrics.generate_output())
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(
+    format: str = Query("top", pattern="^(top|collapsed)$"),
+    limit: int = Query(30, ge=1, le=500)
+):
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="profiling disabled, set PROFILE_SAMPLE_RATE")
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return PlainTextResponse(profiler.top(limit))
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile_reset():
+    profiler.reset()
+    return {"status": "ok"}
+
+@app.post("/admin/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_start(frames: int = Query(10, ge=1, le=100)):
+    start_tracemalloc(frames)
+    return {"status": "ok"}
+
+@app.get("/admin/tracemalloc", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc(limit: int = Query(25, ge=1, le=500)):
+    return PlainTextResponse(tracemalloc_top(limit))
+
+@app.post("/admin/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_stop():
+    stop_tracemalloc()
+    return {"status": "ok"}
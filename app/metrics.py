@@ -10,6 +10,13 @@ class MetricsRegistry:
         self.request_latency_ms_bucket = defaultdict(int)
         self.request_latency_ms_count = 0
         self.request_latency_ms_sum = 0.0
+        self.compression_responses_total = defaultdict(int)
+        self.compression_bytes_saved_total = defaultdict(int)
+        self.compression_duration_ms_sum = defaultdict(float)
+        self.compression_duration_ms_count = defaultdict(int)
+        self.health_probe_latency_ms = {}
+        self.query_cancelled_total = defaultdict(int)
+        self.health_probe_ok = {}
 
     def inc_http_request(self, path: str, status: str):
         with self._lock:
@@ -33,6 +40,24 @@ class MetricsRegistry:
             else:
                 self.request_latency_ms_bucket["+Inf"] += 1
 
+    def observe_compression(self, encoding: str, bytes_saved: int, duration_ms: float = None):
+        """duration_ms is None for precompressed bodies served from memory."""
+        with self._lock:
+            self.compression_responses_total[encoding] += 1
+            self.compression_bytes_saved_total[encoding] += bytes_saved
+            if duration_ms is not None:
+                self.compression_duration_ms_sum[encoding] += duration_ms
+                self.compression_duration_ms_count[encoding] += 1
+
+    def inc_query_cancelled(self, endpoint: str, reason: str):
+        with self._lock:
+            self.query_cancelled_total[(endpoint, reason)] += 1
+
+    def set_health_probe(self, probe: str, ok: bool, latency_ms: float):
+        with self._lock:
+            self.health_probe_latency_ms[probe] = latency_ms
+            self.health_probe_ok[probe] = 1 if ok else 0
+
     def generate_output(self) -> str:
         lines = []
         with self._lock:
@@ -55,6 +80,37 @@ class MetricsRegistry:
                 lines.append(f'request_latency_ms_bucket{{le="{le}"}} {self.request_latency_ms_bucket[le]}')
             lines.append(f'request_latency_ms_count {self.request_latency_ms_count}')
             lines.append(f'request_latency_ms_sum {self.request_latency_ms_sum}')
+
+            # compression
+            lines.append("# HELP compression_responses_total Compressed responses sent")
+            lines.append("# TYPE compression_responses_total counter")
+            for encoding, count in self.compression_responses_total.items():
+                lines.append(f'compression_responses_total{{encoding="{encoding}"}} {count}')
+            lines.append("# HELP compression_bytes_saved_total Response bytes saved by compression")
+            lines.append("# TYPE compression_bytes_saved_total counter")
+            for encoding, saved in self.compression_bytes_saved_total.items():
+                lines.append(f'compression_bytes_saved_total{{encoding="{encoding}"}} {saved}')
+            lines.append("# HELP compression_duration_ms Time spent compressing response bodies")
+            lines.append("# TYPE compression_duration_ms summary")
+            for encoding, count in self.compression_duration_ms_count.items():
+                lines.append(f'compression_duration_ms_count{{encoding="{encoding}"}} {count}')
+                lines.append(f'compression_duration_ms_sum{{encoding="{encoding}"}} {self.compression_duration_ms_sum[encoding]}')
+
+            # query_cancelled_total
+            lines.append("# HELP query_cancelled_total Read queries cancelled by time budget or client disconnect")
+            lines.append("# TYPE query_cancelled_total counter")
+            for (endpoint, reason), count in self.query_cancelled_total.items():
+                lines.append(f'query_cancelled_total{{endpoint="{endpoint}",reason="{reason}"}} {count}')
+
+            # health probes
+            lines.append("# HELP health_probe_latency_ms Latency of the last background health probe")
+            lines.append("# TYPE health_probe_latency_ms gauge")
+            for probe, latency_ms in self.health_probe_latency_ms.items():
+                lines.append(f'health_probe_latency_ms{{probe="{probe}"}} {latency_ms}')
+            lines.append("# HELP health_probe_ok Whether the last background health probe passed")
+            lines.append("# TYPE health_probe_ok gauge")
+            for probe, ok in self.health_probe_ok.items():
+                lines.append(f'health_probe_ok{{probe="{probe}"}} {ok}')
             
         return "\n".join(lines) + "\n"
 
@@ -0,0 +1,108 @@
+import itertools
+import json
+import logging
+import os
+import re
+import time
+
+from app.metrics import metrics
+
+logger = logging.getLogger("api")
+
+# Incoming X-Request-ID values are echoed into logs and headers, so only accept tame ones
+_REQUEST_ID_RE = re.compile(rb"^[A-Za-z0-9._:-]{1,128}$")
+
+# Request ids: a random per-process prefix plus a counter, much cheaper than uuid4()
+_ID_PREFIX = os.urandom(6).hex()
+_id_counter = itertools.count(1)
+
+def new_request_id() -> str:
+    return f"{_ID_PREFIX}-{next(_id_counter):x}"
+
+_ERROR_BODY = json.dumps({"detail": "Internal Server Error"}).encode()
+
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI middleware for request ids, metrics and access logging.
+
+    Observes http.response.start for the status code instead of wrapping the
+    response like BaseHTTPMiddleware, so it adds no extra tasks or streams.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                if _REQUEST_ID_RE.match(value):
+                    request_id = value.decode("latin-1")
+                break
+        if request_id is None:
+            request_id = new_request_id()
+
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+
+        start_time = time.perf_counter()
+        status_code = 500
+        response_started = False
+        id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+                message["headers"] = list(message.get("headers", [])) + [id_header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Unhandled exception
+            logger.error(f"Unhandled exception: {exc}")
+            status_code = 500
+            if response_started:
+                raise
+            await send({
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_ERROR_BODY)).encode()),
+                    id_header,
+                ],
+            })
+            await send({"type": "http.response.body", "body": _ERROR_BODY})
+        finally:
+            duration = (time.perf_counter() - start_time) * 1000
+            path = scope["path"]
+
+            # Label by route template ("/conversations/{a}/{b}"), not the raw
+            # path, so metric series stay bounded
+            route = scope.get("route")
+            metrics.inc_http_request(route.path if route is not None else "unmatched", str(status_code))
+            metrics.observe_latency(duration)
+
+            # Log
+            if logger.isEnabledFor(logging.INFO):
+                extra = {
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status_code,
+                    "latency_ms": round(duration, 3)
+                }
+
+                # Add webhook specific log fields if set in request state
+                webhook_log_extra = state.get("webhook_log_extra")
+                if webhook_log_extra:
+                    extra.update(webhook_log_extra)
+
+                logger.info("Request finished", extra=extra)
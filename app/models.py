@@ -1,7 +1,20 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
+from datetime import datetime, timezone
 from typing import Optional, List
 import re
 
+# Full UTC timestamp: YYYY-MM-DDTHH:MM:SS, optional fraction, ending in Z
+_UTC_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,9})?Z$')
+
+def parse_utc_timestamp(value: str) -> datetime:
+    """Parses a full ISO 8601 UTC timestamp; raises ValueError for anything else."""
+    if _UTC_TIMESTAMP_RE.match(value):
+        try:
+            return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    raise ValueError('Timestamp must be a full ISO 8601 UTC time, e.g. 2025-01-15T10:00:00Z')
+
 # Pydantic Models
 
 class WebhookRequest(BaseModel):
@@ -20,8 +33,7 @@ class WebhookRequest(BaseModel):
     
     @field_validator('ts')
     def validate_iso8601(cls, v):
-         if not v.endswith('Z'):
-             raise ValueError('Timestamp must be UTC and end with Z')
+         parse_utc_timestamp(v)
          return v
 
 class MessageResponse(BaseModel):
@@ -38,6 +50,21 @@ class MessageListResponse(BaseModel):
     limit: int
     offset: int
 
+class ConversationThreadResponse(BaseModel):
+    data: List[MessageResponse]
+    next_cursor: Optional[str]
+
+class ConversationSummary(BaseModel):
+    participant_a: str
+    participant_b: str
+    last_message_id: str
+    last_ts: str
+    message_count: int
+
+class ConversationListResponse(BaseModel):
+    data: List[ConversationSummary]
+    next_cursor: Optional[str]
+
 class SenderStats(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     from_: str = Field(..., alias="from")
@@ -50,6 +77,24 @@ class StatsResponse(BaseModel):
     first_message_ts: Optional[str]
     last_message_ts: Optional[str]
 
+class TimeseriesPoint(BaseModel):
+    bucket_start: str
+    count: int
+
+class TimeseriesResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    bucket: str
+    from_: Optional[str] = Field(None, alias="from")
+    data: List[TimeseriesPoint]
+
+# Columns added to `messages` after its first release, as (name, type).
+# init_db() adds any that an existing database is missing.
+MESSAGE_COLUMN_MIGRATIONS = [
+    ("text_z", "BLOB"),
+    ("text_dict_id", "INTEGER"),
+    ("pair", "TEXT"),
+]
+
 # DB Schema (Raw SQL)
 DB_SCHEMA = """
 CREATE TABLE IF NOT EXISTS messages (
@@ -58,6 +103,56 @@ CREATE TABLE IF NOT EXISTS messages (
     to_msisdn TEXT NOT NULL,
     ts TEXT NOT NULL,
     text TEXT,
-    created_at TEXT NOT NULL
+    created_at TEXT NOT NULL,
+    -- Compressed text storage: text is NULL and text_z holds zstd(text, dictionary text_dict_id)
+    text_z BLOB,
+    text_dict_id INTEGER,
+    -- Conversation key: the two participants in sorted order, "a|b"
+    pair TEXT
 );
+
+CREATE INDEX IF NOT EXISTS idx_messages_pair_ts ON messages (pair, ts, message_id);
+
+-- Last message per participant pair, maintained by the insert path
+CREATE TABLE IF NOT EXISTS conversations (
+    pair TEXT PRIMARY KEY,
+    participant_a TEXT NOT NULL,
+    participant_b TEXT NOT NULL,
+    last_message_id TEXT NOT NULL,
+    last_ts TEXT NOT NULL,
+    message_count INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_last_ts ON conversations (last_ts, pair);
+
+-- Trained zstd dictionaries; append-only so older rows stay readable
+CREATE TABLE IF NOT EXISTS text_dictionaries (
+    dict_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    sample_count INTEGER NOT NULL,
+    dict_data BLOB NOT NULL
+);
+
+-- Pre-bucketed message counts, maintained by the insert path.
+-- from_msisdn = '' holds the all-senders series.
+CREATE TABLE IF NOT EXISTS message_rollups_minute (
+    from_msisdn TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (from_msisdn, bucket_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS message_rollups_hour (
+    from_msisdn TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (from_msisdn, bucket_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS message_rollups_day (
+    from_msisdn TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (from_msisdn, bucket_start)
+) WITHOUT ROWID;
 """
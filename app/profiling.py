@@ -0,0 +1,176 @@
+import itertools
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+# Leaf frames of threads blocked waiting for work: the event loop's selector,
+# idle threadpool workers and threads joining on a lock
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+
+def _label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})".replace(" ", "_").replace(";", ":")
+
+def _stack(frame) -> Optional[Tuple[str, ...]]:
+    """Root-to-leaf frame labels, or None for a thread that is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+class RequestProfiler:
+    """
+    Stack sampler for 1-in-N sampled requests.
+
+    While a sampled request is in flight, a background thread snapshots the
+    stacks of every thread (sys._current_frames) each interval. That covers
+    the threadpool, where inserts, read queries and zstd run, and not just
+    the event loop. Idle threads are skipped. Anything else running at the
+    same time is recorded too, because samples are per thread and not per
+    request. Only one request is profiled at a time.
+    """
+
+    def __init__(self, sample_rate: int, interval_ms: float = 5.0):
+        self.sample_rate = sample_rate
+        self.interval_s = interval_ms / 1000
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._active = False
+        self._stacks: Counter = Counter()
+        self.samples = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self) -> Optional[Tuple[threading.Thread, threading.Event]]:
+        """Starts sampling if this request is sampled; returns a handle for finish(), else None."""
+        if next(self._counter) % self.sample_rate:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+        stop = threading.Event()
+        thread = threading.Thread(target=self._sample, args=(stop,), name="request-profiler", daemon=True)
+        thread.start()
+        return thread, stop
+
+    def finish(self, handle: Tuple[threading.Thread, threading.Event]):
+        """Stops sampling and merges the stacks. Blocks for up to one interval."""
+        thread, stop = handle
+        stop.set()
+        thread.join()
+
+    def _sample(self, stop: threading.Event):
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        try:
+            while True:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = _stack(frame)
+                    if stack is not None:
+                        stacks[stack] += 1
+                if stop.wait(self.interval_s):
+                    break
+        finally:
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+                self._active = False
+
+    def reset(self):
+        with self._lock:
+            self._stacks = Counter()
+            self.samples = 0
+
+    def top(self, limit: int) -> str:
+        """Top functions by stack samples they appear in (total) and are running in (self)."""
+        with self._lock:
+            if not self.samples:
+                return "no samples yet\n"
+            total: Counter = Counter()
+            own: Counter = Counter()
+            for stack, count in self._stacks.items():
+                for label in set(stack):
+                    total[label] += count
+                own[stack[-1]] += count
+            lines = [
+                f"samples: {self.samples} requests, {sum(self._stacks.values())} stacks",
+                f"{'total':>8} {'self':>8}  function",
+            ]
+            for label, count in total.most_common(limit):
+                lines.append(f"{count:>8} {own[label]:>8}  {label}")
+            return "\n".join(lines) + "\n"
+
+    def collapsed(self) -> str:
+        """Root-to-leaf stacks with sample counts, in the collapsed-stack format flamegraph tools read."""
+        with self._lock:
+            return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self._stacks.items())
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling sampled requests. Only installed when
+    PROFILE_SAMPLE_RATE > 0, so it costs nothing when profiling is off.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        handle = self.profiler.start()
+        if handle is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Joining the sampler thread must not block the loop
+            await run_in_threadpool(self.profiler.finish, handle)
+
+def start_tracemalloc(frames: int):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+def stop_tracemalloc():
+    tracemalloc.stop()
+
+def tracemalloc_top(limit: int) -> str:
+    """Top allocation sites by size from a fresh snapshot."""
+    if not tracemalloc.is_tracing():
+        return "tracemalloc is not running\n"
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: current={current} B peak={peak} B"]
+    for stat in snapshot.statistics("lineno")[:limit]:
+        lines.append(str(stat))
+    return "\n".join(lines) + "\n"
+
+profiler = RequestProfiler(settings.PROFILE_SAMPLE_RATE, settings.PROFILE_INTERVAL_MS)
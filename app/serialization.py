@@ -0,0 +1,56 @@
+import base64
+import json
+from typing import Any, Iterable, Optional, Tuple
+
+# Same settings as starlette's JSONResponse.render, so fast-path payloads stay
+# byte-for-byte identical to what FastAPI would produce from the pydantic models.
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+# encode_basestring is what the encoder above uses for str values (C implementation)
+_quote = json.encoder.encode_basestring
+
+# Public field names of MessageResponse, in model order ("from" is the alias of from_)
+MESSAGE_FIELDS = ("message_id", "from", "to", "ts", "text")
+
+_MESSAGE_TEMPLATE = '{"message_id":%s,"from":%s,"to":%s,"ts":%s,"text":%s}'
+_LIST_TEMPLATE = '{"data":[%s],"total":%d,"limit":%d,"offset":%d}'
+_THREAD_TEMPLATE = '{"data":[%s],"next_cursor":%s}'
+
+def render_json(content: Any) -> bytes:
+    return _encoder.encode(content).encode("utf-8")
+
+def render_message(row: tuple) -> str:
+    message_id, from_msisdn, to_msisdn, ts, text = row
+    return _MESSAGE_TEMPLATE % (
+        _quote(message_id),
+        _quote(from_msisdn),
+        _quote(to_msisdn),
+        _quote(ts),
+        "null" if text is None else _quote(text)
+    )
+
+def render_message_list(rows: Iterable[tuple], total: int, limit: int, offset: int) -> bytes:
+    """
+    Renders a MessageListResponse payload straight from (message_id, from, to,
+    ts, text) tuples, skipping the pydantic and jsonable_encoder layers.
+    """
+    data = ",".join([render_message(row) for row in rows])
+    return (_LIST_TEMPLATE % (data, total, limit, offset)).encode("utf-8")
+
+def render_thread(rows: Iterable[tuple], next_cursor: Optional[str]) -> bytes:
+    """Renders a ConversationThreadResponse payload from message tuples."""
+    data = ",".join([render_message(row) for row in rows])
+    return (_THREAD_TEMPLATE % (data, "null" if next_cursor is None else _quote(next_cursor))).encode("utf-8")
+
+def encode_cursor(*values: str) -> str:
+    """Opaque keyset pagination cursor."""
+    return base64.urlsafe_b64encode(_encoder.encode(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> Tuple[str, ...]:
+    """Raises ValueError for anything encode_cursor didn't produce."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise ValueError("invalid cursor")
+    return tuple(values)
@@ -0,0 +1,48 @@
+"""
+Service entrypoint: uvicorn with shutdown draining wired to the signal.
+
+    python -m app.serve [--host HOST] [--port PORT]
+
+uvicorn closes its listeners and waits for in-flight requests *before* it
+sends the lifespan shutdown event, so by then there is nothing left to drain.
+Draining therefore starts in the signal handler: /health/ready turns 503 and
+webhooks are rejected with 503 + Retry-After from that moment, and uvicorn
+waits for in-flight requests up to SHUTDOWN_DRAIN_TIMEOUT_S before it
+cancels them and runs the lifespan shutdown (WAL checkpoint).
+"""
+import argparse
+import sys
+from types import FrameType
+from typing import List, Optional
+
+import uvicorn
+
+from app.config import settings
+from app.lifecycle import lifecycle
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        lifecycle.begin_drain()
+        super().handle_exit(sig, frame)
+
+def build_server(host: str, port: int, **config_kwargs) -> DrainingServer:
+    config = uvicorn.Config(
+        "app.main:app",
+        host=host,
+        port=port,
+        timeout_graceful_shutdown=settings.SHUTDOWN_DRAIN_TIMEOUT_S,
+        **config_kwargs
+    )
+    return DrainingServer(config)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description="Run the API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    build_server(args.host, args.port).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,96 +1,287 @@
 import sqlite3
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 import logging
 from typing import List, Optional, Tuple, Any
 
-from app.models import DB_SCHEMA, WebhookRequest, MessageResponse, SenderStats, StatsResponse
+from app.models import (
+    DB_SCHEMA, MESSAGE_COLUMN_MIGRATIONS, WebhookRequest, SenderStats, StatsResponse, parse_utc_timestamp,
+    TimeseriesPoint, TimeseriesResponse, ConversationSummary
+)
 from app.config import settings
+from app.text_codec import codec
 
 logger = logging.getLogger("api")
 
+# Rollup granularity -> (table, strftime format of the bucket start). The
+# formats are shared by Python's strftime and SQLite's.
+ROLLUP_BUCKETS = {
+    "minute": ("message_rollups_minute", "%Y-%m-%dT%H:%M:00Z"),
+    "hour": ("message_rollups_hour", "%Y-%m-%dT%H:00:00Z"),
+    "day": ("message_rollups_day", "%Y-%m-%dT00:00:00Z"),
+}
+# Sender key of the all-senders series in the rollup tables
+ALL_SENDERS = ""
+
+def bucket_start(ts: str, bucket: str) -> str:
+    """Start of the bucket `ts` falls into; raises ValueError for a malformed ts."""
+    return parse_utc_timestamp(ts).strftime(ROLLUP_BUCKETS[bucket][1])
+
+def conversation_pair(a: str, b: str) -> str:
+    """Order-independent key for the conversation between two numbers."""
+    return f"{a}|{b}" if a <= b else f"{b}|{a}"
+
+def get_db_path() -> str:
+    # Extract path from sqlite:////data/app.db -> /data/app.db
+    return settings.DATABASE_URL.replace("sqlite:///", "")
+
 def get_db_connection():
     try:
-        # Extract path from sqlite:////data/app.db -> /data/app.db
-        db_path = settings.DATABASE_URL.replace("sqlite:///", "")
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(get_db_path())
         conn.row_factory = sqlite3.Row
+        # Lets queries filter on compressed text
+        conn.create_function("zstd_text", 2, codec.sql_text, deterministic=True)
         return conn
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         raise e
 
+# SQLite VM instructions between budget checks
+BUDGET_CHECK_STEPS = 10000
+
+class QueryCancelled(Exception):
+    """A read query was interrupted. reason is "timeout" or "disconnected"."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"query cancelled: {reason}")
+        self.reason = reason
+
+class QueryBudget:
+    """
+    Time budget and cancellation flag for a read query, enforced through
+    sqlite3's progress handler. cancel() may be called from another thread.
+    """
+
+    def __init__(self, timeout_ms: int):
+        self.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms > 0 else None
+        self.cancelled = False
+        self.reason: Optional[str] = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _check(self) -> int:
+        # A non-zero return makes SQLite abort the statement with "interrupted"
+        if self.cancelled:
+            self.reason = "disconnected"
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "timeout"
+            return 1
+        return 0
+
+    def install(self, conn: sqlite3.Connection):
+        conn.set_progress_handler(self._check, BUDGET_CHECK_STEPS)
+
+@contextmanager
+def read_connection(budget: Optional[QueryBudget] = None):
+    """Connection for read queries, enforcing `budget` if given."""
+    conn = get_db_connection()
+    if budget is not None:
+        budget.install(conn)
+    try:
+        yield conn
+    except sqlite3.OperationalError as e:
+        if budget is not None and budget.reason is not None:
+            raise QueryCancelled(budget.reason) from e
+        raise
+    finally:
+        conn.close()
+
 def init_db():
     conn = get_db_connection()
     try:
+        # WAL lets readers run alongside the writer; the setting persists in the file
+        conn.execute("PRAGMA journal_mode=WAL")
+        migrate_message_columns(conn)
         conn.executescript(DB_SCHEMA)
         conn.commit()
+        backfill_rollups(conn)
+        backfill_conversations(conn)
     finally:
         conn.close()
 
-def insert_message(msg: WebhookRequest) -> bool:
+def migrate_message_columns(conn: sqlite3.Connection):
+    """Adds columns introduced after the first release to an existing messages table."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    if not existing:
+        # Fresh database: DB_SCHEMA creates the full table
+        return
+    for name, column_type in MESSAGE_COLUMN_MIGRATIONS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE messages ADD COLUMN {name} {column_type}")
+    conn.commit()
+
+def backfill_rollups(conn: sqlite3.Connection):
     """
-    Inserts a message. Returns True if inserted, False if duplicate.
+    Populates empty rollup tables from existing messages (e.g. a database
+    created before rollups existed). A no-op once rollups are in place.
     """
-    conn = get_db_connection()
-    try:
-        created_at = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    for table, fmt in ROLLUP_BUCKETS.values():
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            continue
+        # strftime() normalises the bucket like bucket_start(); rows whose ts
+        # SQLite cannot parse (stored before ts was validated) are skipped
+        bucket_expr = f"strftime('{fmt}', ts)"
         conn.execute(
-            "INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (msg.message_id, msg.from_, msg.to, msg.ts, msg.text, created_at)
+            f"INSERT INTO {table} (from_msisdn, bucket_start, count) "
+            f"SELECT from_msisdn, {bucket_expr} AS b, COUNT(*) FROM messages WHERE b IS NOT NULL GROUP BY 1, 2"
         )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        # Duplicate message_id
+        conn.execute(
+            f"INSERT INTO {table} (from_msisdn, bucket_start, count) "
+            f"SELECT ?, {bucket_expr} AS b, COUNT(*) FROM messages WHERE b IS NOT NULL GROUP BY 2",
+            (ALL_SENDERS,)
+        )
+    conn.commit()
+
+def backfill_conversations(conn: sqlite3.Connection):
+    """
+    Fills the pair column and the conversations table for messages stored
+    before conversations existed. A no-op once every message has a pair.
+    """
+    if not conn.execute("SELECT 1 FROM messages WHERE pair IS NULL LIMIT 1").fetchone():
+        return
+    conn.execute(
+        "UPDATE messages SET pair = CASE WHEN from_msisdn <= to_msisdn "
+        "THEN from_msisdn || '|' || to_msisdn ELSE to_msisdn || '|' || from_msisdn END "
+        "WHERE pair IS NULL"
+    )
+    conn.execute("DELETE FROM conversations")
+    # With MAX(), SQLite takes the bare message_id from the row holding the max ts
+    conn.execute(
+        "INSERT INTO conversations (pair, participant_a, participant_b, last_message_id, last_ts, message_count) "
+        "SELECT pair, substr(pair, 1, instr(pair, '|') - 1), substr(pair, instr(pair, '|') + 1), "
+        "message_id, MAX(ts), COUNT(*) FROM messages GROUP BY pair"
+    )
+    conn.commit()
+
+def update_conversation(conn: sqlite3.Connection, pair: str, message_id: str, ts: str):
+    """Counts a new message in its conversation and moves the last-message pointer if it is newer."""
+    participant_a, participant_b = pair.split("|", 1)
+    conn.execute(
+        "INSERT INTO conversations (pair, participant_a, participant_b, last_message_id, last_ts, message_count) "
+        "VALUES (?, ?, ?, ?, ?, 1) "
+        "ON CONFLICT (pair) DO UPDATE SET message_count = message_count + 1, "
+        "last_message_id = CASE WHEN (excluded.last_ts, excluded.last_message_id) > (last_ts, last_message_id) "
+        "THEN excluded.last_message_id ELSE last_message_id END, "
+        "last_ts = MAX(last_ts, excluded.last_ts)",
+        (pair, participant_a, participant_b, message_id, ts)
+    )
+
+def increment_rollups(conn: sqlite3.Connection, from_msisdn: str, ts: str, count: int = 1):
+    """
+    Adds `count` messages to every rollup bucket containing `ts`, for both the
+    sender's series and the all-senders series. Runs in the caller's transaction.
+    """
+    for bucket, (table, _) in ROLLUP_BUCKETS.items():
+        start = bucket_start(ts, bucket)
+        conn.executemany(
+            f"INSERT INTO {table} (from_msisdn, bucket_start, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (from_msisdn, bucket_start) DO UPDATE SET count = count + excluded.count",
+            ((from_msisdn, start, count), (ALL_SENDERS, start, count))
+        )
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def insert_message_row(conn: sqlite3.Connection, msg: WebhookRequest, created_at: str) -> bool:
+    """
+    Inserts one message and updates its conversation in the caller's
+    transaction, without rollups. Returns False if the message_id already exists.
+    """
+    text, text_z, text_dict_id = msg.text, None, None
+    if text is not None and codec.enabled:
+        text_dict_id = codec.latest_dict_id(conn)
+        if text_dict_id is not None:
+            text, text_z = None, codec.compress(msg.text, text_dict_id)
+
+    pair = conversation_pair(msg.from_, msg.to)
+    cursor = conn.execute(
+        "INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text, created_at, text_z, text_dict_id, pair) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (message_id) DO NOTHING",
+        (msg.message_id, msg.from_, msg.to, msg.ts, text, created_at, text_z, text_dict_id, pair)
+    )
+    if cursor.rowcount != 1:
         return False
-    finally:
-        conn.close()
+    update_conversation(conn, pair, msg.message_id, msg.ts)
+    return True
 
-def get_messages(limit: int, offset: int, from_filter: Optional[str], since_filter: Optional[str], q_filter: Optional[str]) -> Tuple[List[MessageResponse], int]:
+def insert_message(msg: WebhookRequest) -> bool:
+    """
+    Inserts a message. Returns True if inserted, False if duplicate.
+    """
     conn = get_db_connection()
     try:
-        query = "SELECT * FROM messages WHERE 1=1"
-        params: List[Any] = []
-        
-        if from_filter:
-            query += " AND from_msisdn = ?"
-            params.append(from_filter)
-        if since_filter:
-            query += " AND ts >= ?"
-            params.append(since_filter)
-        if q_filter:
-            query += " AND text LIKE ?"
-            params.append(f"%{q_filter}%")
-            
-        # Get total count first
-        count_query = f"SELECT COUNT(*) as cnt FROM ({query})"
-        cursor = conn.execute(count_query, params)
-        total = cursor.fetchone()['cnt']
-        
-        # Get data
-        query += " ORDER BY ts ASC, message_id ASC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        results = [
-            MessageResponse(
-                message_id=row['message_id'],
-                from_=row['from_msisdn'],
-                to=row['to_msisdn'],
-                ts=row['ts'],
-                text=row['text']
-            ) for row in rows
-        ]
-        
-        return results, total
+        inserted = insert_message_row(conn, msg, now_iso())
+        if inserted:
+            increment_rollups(conn, msg.from_, msg.ts)
+        conn.commit()
+        return inserted
     finally:
         conn.close()
 
-def get_stats() -> StatsResponse:
-    conn = get_db_connection()
-    try:
+# Column order matches app.serialization.MESSAGE_FIELDS
+MESSAGE_COLUMNS = "message_id, from_msisdn, to_msisdn, ts, text"
+
+def query_message_rows(conn: sqlite3.Connection, limit: int, offset: int, from_filter: Optional[str], since_filter: Optional[str], q_filter: Optional[str]) -> Tuple[List[tuple], int]:
+    """
+    Runs the /messages query and returns plain tuples in MESSAGE_COLUMNS order
+    plus the total count of matching rows.
+    """
+    # Plain tuples are cheaper to build than sqlite3.Row
+    conn.row_factory = None
+
+    where = " WHERE 1=1"
+    params: List[Any] = []
+
+    if from_filter:
+        where += " AND from_msisdn = ?"
+        params.append(from_filter)
+    if since_filter:
+        where += " AND ts >= ?"
+        params.append(since_filter)
+    if q_filter:
+        # zstd_text() only runs for rows stored compressed (text IS NULL)
+        codec.refresh(conn)
+        where += " AND COALESCE(text, zstd_text(text_z, text_dict_id)) LIKE ?"
+        params.append(f"%{q_filter}%")
+
+    # Get total count first
+    total = conn.execute("SELECT COUNT(*) FROM messages" + where, params).fetchone()[0]
+
+    # Get data
+    query = f"SELECT {MESSAGE_COLUMNS}, text_z, text_dict_id FROM messages{where} ORDER BY ts ASC, message_id ASC LIMIT ? OFFSET ?"
+    rows = conn.execute(query, params + [limit, offset]).fetchall()
+
+    return with_text(conn, rows), total
+
+def with_text(conn: sqlite3.Connection, rows: List[tuple]) -> List[tuple]:
+    """
+    Turns (MESSAGE_COLUMNS..., text_z, text_dict_id) rows into MESSAGE_COLUMNS
+    rows, decompressing text only for the rows being returned.
+    """
+    return [
+        row[:4] + (row[4] if row[5] is None else codec.decompress(row[5], row[6], conn),)
+        for row in rows
+    ]
+
+def get_message_rows(limit: int, offset: int, from_filter: Optional[str], since_filter: Optional[str], q_filter: Optional[str], budget: Optional[QueryBudget] = None) -> Tuple[List[tuple], int]:
+    with read_connection(budget) as conn:
+        return query_message_rows(conn, limit, offset, from_filter, since_filter, q_filter)
+
+def get_stats(budget: Optional[QueryBudget] = None) -> StatsResponse:
+    with read_connection(budget) as conn:
         # Total messages
         total_cursor = conn.execute("SELECT COUNT(*) as cnt, MIN(ts) as min_ts, MAX(ts) as max_ts FROM messages")
         total_row = total_cursor.fetchone()
@@ -123,5 +314,73 @@ def get_stats() -> StatsResponse:
             first_message_ts=first_ts,
             last_message_ts=last_ts
         )
-    finally:
-        conn.close()
+
+def get_timeseries(bucket: str, from_filter: Optional[str], since_filter: Optional[str], until_filter: Optional[str], limit: int, budget: Optional[QueryBudget] = None) -> TimeseriesResponse:
+    """
+    Reads message counts per bucket from the rollup tables. Cost is proportional
+    to the number of buckets returned, not the number of messages.
+    """
+    table = ROLLUP_BUCKETS[bucket][0]
+    with read_connection(budget) as conn:
+        query = f"SELECT bucket_start, count FROM {table} WHERE from_msisdn = ?"
+        params: List[Any] = [from_filter or ALL_SENDERS]
+
+        if since_filter:
+            # Include the bucket that `since` falls into
+            query += " AND bucket_start >= ?"
+            params.append(bucket_start(since_filter, bucket))
+        if until_filter:
+            query += " AND bucket_start <= ?"
+            params.append(until_filter)
+
+        query += " ORDER BY bucket_start ASC LIMIT ?"
+        params.append(limit)
+
+        rows = conn.execute(query, params).fetchall()
+
+        return TimeseriesResponse(
+            bucket=bucket,
+            from_=from_filter,
+            data=[TimeseriesPoint(bucket_start=row['bucket_start'], count=row['count']) for row in rows]
+        )
+
+def get_conversation_rows(a: str, b: str, limit: int, after: Optional[Tuple[str, str]], budget: Optional[QueryBudget] = None) -> List[tuple]:
+    """
+    Messages between two numbers in either direction, oldest first, via the
+    (pair, ts, message_id) index. `after` is the (ts, message_id) keyset cursor.
+    """
+    with read_connection(budget) as conn:
+        conn.row_factory = None
+        query = f"SELECT {MESSAGE_COLUMNS}, text_z, text_dict_id FROM messages WHERE pair = ?"
+        params: List[Any] = [conversation_pair(a, b)]
+        if after is not None:
+            query += " AND (ts, message_id) > (?, ?)"
+            params.extend(after)
+        query += " ORDER BY ts ASC, message_id ASC LIMIT ?"
+        params.append(limit)
+        return with_text(conn, conn.execute(query, params).fetchall())
+
+def get_recent_conversations(limit: int, before: Optional[Tuple[str, str]], budget: Optional[QueryBudget] = None) -> List[ConversationSummary]:
+    """
+    Conversations by most recent message, newest first, from the conversations
+    table. `before` is the (last_ts, pair) keyset cursor.
+    """
+    with read_connection(budget) as conn:
+        query = "SELECT pair, participant_a, participant_b, last_message_id, last_ts, message_count FROM conversations"
+        params: List[Any] = []
+        if before is not None:
+            query += " WHERE (last_ts, pair) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY last_ts DESC, pair DESC LIMIT ?"
+        params.append(limit)
+        rows = conn.execute(query, params).fetchall()
+
+        return [
+            ConversationSummary(
+                participant_a=row['participant_a'],
+                participant_b=row['participant_b'],
+                last_message_id=row['last_message_id'],
+                last_ts=row['last_ts'],
+                message_count=row['message_count']
+            ) for row in rows
+        ]
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+# Optional: compressed text storage needs the zstandard package
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# How often the write path looks for a newly trained dictionary
+REFRESH_INTERVAL_S = 5.0
+
+class TextCodec:
+    """
+    Compresses message text with zstd dictionaries from the text_dictionaries
+    table. Dictionaries are append-only, so every row stays readable with the
+    dictionary it was written with; new rows use the latest one.
+    """
+
+    def __init__(self):
+        self._dicts: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._latest_id: Optional[int] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        # zstd (de)compressors are not thread-safe: one per thread and dictionary
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        return zstandard is not None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TEXT_COMPRESSION and zstandard is not None
+
+    def check(self, conn: sqlite3.Connection):
+        """
+        Raises RuntimeError at startup when compressed text is configured or
+        may be stored (a dictionary exists) but zstandard is not installed;
+        otherwise writes would silently stay plain and reads would fail.
+        """
+        if self.available:
+            return
+        if settings.TEXT_COMPRESSION:
+            raise RuntimeError("TEXT_COMPRESSION is set but the zstandard package is not installed")
+        if conn.execute("SELECT 1 FROM text_dictionaries LIMIT 1").fetchone():
+            raise RuntimeError("compressed text dictionaries exist but the zstandard package is not installed")
+
+    def refresh(self, conn: sqlite3.Connection):
+        """Loads dictionaries added since the last refresh."""
+        if zstandard is None:
+            return
+        with self._lock:
+            known = self._latest_id or 0
+        rows = conn.execute(
+            "SELECT dict_id, dict_data FROM text_dictionaries WHERE dict_id > ? ORDER BY dict_id", (known,)
+        ).fetchall()
+        with self._lock:
+            for dict_id, dict_data in rows:
+                self._dicts[dict_id] = zstandard.ZstdCompressionDict(dict_data)
+                self._latest_id = dict_id
+            self._refreshed_at = time.monotonic()
+
+    def latest_dict_id(self, conn: sqlite3.Connection) -> Optional[int]:
+        if time.monotonic() - self._refreshed_at > REFRESH_INTERVAL_S:
+            self.refresh(conn)
+        return self._latest_id
+
+    def _compressor(self, dict_id: int):
+        compressors = getattr(self._local, "compressors", None)
+        if compressors is None:
+            compressors = self._local.compressors = {}
+        if dict_id not in compressors:
+            compressors[dict_id] = zstandard.ZstdCompressor(
+                level=settings.TEXT_COMPRESSION_LEVEL, dict_data=self._dicts[dict_id]
+            )
+        return compressors[dict_id]
+
+    def _decompressor(self, dict_id: int):
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        if dict_id not in decompressors:
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts[dict_id])
+        return decompressors[dict_id]
+
+    def compress(self, text: str, dict_id: int) -> bytes:
+        return self._compressor(dict_id).compress(text.encode("utf-8"))
+
+    def decompress(self, blob: bytes, dict_id: int, conn: Optional[sqlite3.Connection] = None) -> str:
+        if zstandard is None:
+            raise RuntimeError("compressed text found but the zstandard package is not installed")
+        if dict_id not in self._dicts and conn is not None:
+            self.refresh(conn)
+        return self._decompressor(dict_id).decompress(blob).decode("utf-8")
+
+    def sql_text(self, blob: Optional[bytes], dict_id: Optional[int]) -> Optional[str]:
+        """SQL function zstd_text(text_z, text_dict_id); call refresh() before querying."""
+        if blob is None:
+            return None
+        return self.decompress(blob, dict_id)
+
+codec = TextCodec()
@@ -0,0 +1,226 @@
+"""
+Maintenance commands for compressed message text storage.
+
+    python -m app.text_compression train [--samples N] [--dict-size BYTES]
+    python -m app.text_compression compress [--recompress]
+    python -m app.text_compression decompress
+    python -m app.text_compression report
+
+`train` stores a new zstd dictionary built from recent messages; with
+TEXT_COMPRESSION=true the service compresses new text with the latest
+dictionary. `compress` converts existing rows, `decompress` reverts them to
+plain text, and `report` shows the space and scan-time savings.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from app.storage import get_db_connection, init_db, now_iso
+from app.text_codec import codec, zstandard
+
+def sample_texts(conn: sqlite3.Connection, limit: int) -> List[bytes]:
+    """Most recent message texts, decompressed where needed."""
+    codec.refresh(conn)
+    rows = conn.execute(
+        "SELECT text, text_z, text_dict_id FROM messages "
+        "WHERE text IS NOT NULL OR text_z IS NOT NULL ORDER BY ts DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [
+        (row[0] if row[1] is None else codec.decompress(row[1], row[2])).encode("utf-8")
+        for row in rows
+    ]
+
+def train(conn: sqlite3.Connection, samples: int, dict_size: int) -> dict:
+    texts = sample_texts(conn, samples)
+    if not texts:
+        raise ValueError("no message text to train on")
+    try:
+        trained = zstandard.train_dictionary(dict_size, texts)
+    except zstandard.ZstdError as e:
+        raise ValueError(f"training failed ({len(texts)} samples): {e}")
+
+    cursor = conn.execute(
+        "INSERT INTO text_dictionaries (created_at, sample_count, dict_data) VALUES (?, ?, ?)",
+        (now_iso(), len(texts), trained.as_bytes())
+    )
+    conn.commit()
+    codec.refresh(conn)
+    return {"dict_id": cursor.lastrowid, "samples": len(texts), "dict_bytes": len(trained.as_bytes())}
+
+def compress(conn: sqlite3.Connection, batch_size: int, recompress: bool) -> dict:
+    codec.refresh(conn)
+    dict_id = codec.latest_dict_id(conn)
+    if dict_id is None:
+        raise ValueError("no dictionary yet, run train first")
+
+    condition = "text IS NOT NULL"
+    if recompress:
+        condition += " OR (text_z IS NOT NULL AND text_dict_id != ?)"
+    params = (dict_id,) if recompress else ()
+
+    converted = 0
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT rowid, text, text_z, text_dict_id FROM messages WHERE rowid > ? AND ({condition}) "
+            "ORDER BY rowid LIMIT ?",
+            (last_rowid,) + params + (batch_size,)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for rowid, text, text_z, old_dict_id in rows:
+            if text is None:
+                text = codec.decompress(text_z, old_dict_id)
+            updates.append((codec.compress(text, dict_id), dict_id, rowid))
+        conn.executemany("UPDATE messages SET text = NULL, text_z = ?, text_dict_id = ? WHERE rowid = ?", updates)
+        conn.commit()
+        converted += len(rows)
+        last_rowid = rows[-1][0]
+    return {"dict_id": dict_id, "converted": converted}
+
+def decompress(conn: sqlite3.Connection, batch_size: int) -> dict:
+    codec.refresh(conn)
+    converted = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, text_z, text_dict_id FROM messages WHERE text_z IS NOT NULL LIMIT ?", (batch_size,)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE messages SET text = ?, text_z = NULL, text_dict_id = NULL WHERE rowid = ?",
+            [(codec.decompress(text_z, dict_id), rowid) for rowid, text_z, dict_id in rows]
+        )
+        conn.commit()
+        converted += len(rows)
+    return {"converted": converted}
+
+def _timed_scan(path: str) -> float:
+    """Times the full-table scans /stats and an unindexed /messages filter do."""
+    conn = sqlite3.connect(path)
+    try:
+        start = time.perf_counter()
+        conn.execute("SELECT from_msisdn, COUNT(*) FROM messages GROUP BY from_msisdn").fetchall()
+        conn.execute("SELECT COUNT(*) FROM messages WHERE ts >= ''").fetchone()
+        return (time.perf_counter() - start) * 1000
+    finally:
+        conn.close()
+
+def _build_sample_db(path: str, rows: List[tuple], compressed: bool, dict_id: Optional[int]):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            "CREATE TABLE messages (message_id TEXT PRIMARY KEY, from_msisdn TEXT, to_msisdn TEXT, "
+            "ts TEXT, text TEXT, text_z BLOB, text_dict_id INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                row[:4] + ((None, codec.compress(row[4], dict_id), dict_id) if compressed and row[4] is not None else (row[4], None, None))
+                for row in rows
+            ]
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def report(conn: sqlite3.Connection, scan_sample: int) -> dict:
+    codec.refresh(conn)
+    counts = conn.execute(
+        "SELECT COUNT(*), "
+        "SUM(text_z IS NOT NULL), "
+        "SUM(COALESCE(length(CAST(text AS BLOB)), 0)), "
+        "SUM(COALESCE(length(text_z), 0)) "
+        "FROM messages"
+    ).fetchone()
+    total, compressed_rows, plain_bytes, compressed_bytes = (value or 0 for value in counts)
+
+    # Original size of compressed rows, from the zstd frame headers
+    original_bytes = 0
+    for (text_z,) in conn.execute("SELECT text_z FROM messages WHERE text_z IS NOT NULL"):
+        original_bytes += zstandard.frame_content_size(text_z)
+
+    result = {
+        "rows": total,
+        "compressed_rows": compressed_rows,
+        "dictionaries": conn.execute("SELECT COUNT(*) FROM text_dictionaries").fetchone()[0],
+        "plain_text_bytes": plain_bytes,
+        "compressed_text_bytes": compressed_bytes,
+        "compressed_rows_original_bytes": original_bytes,
+        "compression_ratio": round(original_bytes / compressed_bytes, 2) if compressed_bytes else None,
+    }
+
+    # Scan-time comparison on identical copies of a sample, plain vs compressed
+    dict_id = codec.latest_dict_id(conn)
+    if dict_id is not None:
+        rows = conn.execute(
+            "SELECT message_id, from_msisdn, to_msisdn, ts, COALESCE(text, zstd_text(text_z, text_dict_id)) "
+            "FROM messages ORDER BY ts DESC LIMIT ?",
+            (scan_sample,)
+        ).fetchall()
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, "plain.db")
+            compressed_path = os.path.join(tmp, "compressed.db")
+            _build_sample_db(plain_path, rows, False, dict_id)
+            _build_sample_db(compressed_path, rows, True, dict_id)
+            result["scan_sample_rows"] = len(rows)
+            result["sample_db_bytes_plain"] = os.path.getsize(plain_path)
+            result["sample_db_bytes_compressed"] = os.path.getsize(compressed_path)
+            result["sample_scan_ms_plain"] = round(_timed_scan(plain_path), 3)
+            result["sample_scan_ms_compressed"] = round(_timed_scan(compressed_path), 3)
+    return result
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.text_compression", description="Manage compressed message text storage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="train and store a new dictionary from recent messages")
+    train_parser.add_argument("--samples", type=int, default=10000, help="messages to sample")
+    train_parser.add_argument("--dict-size", type=int, default=64 * 1024, help="dictionary size in bytes")
+
+    compress_parser = commands.add_parser("compress", help="compress stored plain text with the latest dictionary")
+    compress_parser.add_argument("--recompress", action="store_true", help="also move rows from older dictionaries")
+    compress_parser.add_argument("--batch-size", type=int, default=10000)
+
+    decompress_parser = commands.add_parser("decompress", help="revert compressed rows to plain text")
+    decompress_parser.add_argument("--batch-size", type=int, default=10000)
+
+    report_parser = commands.add_parser("report", help="show space and scan-time savings")
+    report_parser.add_argument("--scan-sample", type=int, default=100000, help="rows copied for the scan-time comparison")
+
+    args = parser.parse_args(argv)
+    if zstandard is None:
+        parser.error("the zstandard package is not installed")
+
+    init_db()
+    conn = get_db_connection()
+    # Plain tuples: these commands unpack rows positionally
+    conn.row_factory = None
+    try:
+        if args.command == "train":
+            result = train(conn, args.samples, args.dict_size)
+        elif args.command == "compress":
+            result = compress(conn, args.batch_size, args.recompress)
+        elif args.command == "decompress":
+            result = decompress(conn, args.batch_size)
+        else:
+            result = report(conn, args.scan_sample)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(json.dumps(result))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
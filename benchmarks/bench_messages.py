@@ -0,0 +1,95 @@
+"""
+Compares the /messages serialization paths at limit=100:
+
+  models: sqlite3.Row -> MessageResponse -> MessageListResponse -> jsonable_encoder -> JSONResponse
+          (the original get_messages query, reproduced below)
+  fast:   tuple rows -> app.serialization.render_message_list -> Response
+
+Run from the repo root:  python -m benchmarks.bench_messages
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from app.models import WebhookRequest, MessageListResponse, MessageResponse
+from app.serialization import render_message_list
+from app.storage import init_db, insert_message, get_db_connection, get_message_rows
+
+LIMIT = 100
+ITERATIONS = 500
+
+def seed(count: int):
+    for i in range(count):
+        insert_message(WebhookRequest(**{
+            "message_id": f"bench_{i}",
+            "from": f"+1555{i % 50:04d}",
+            "to": "+15550000",
+            "ts": f"2025-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "text": "Your verification code is %06d. It expires in 10 minutes." % i,
+        }))
+
+def baseline_get_messages(limit: int, offset: int):
+    """The /messages query as it was before the fast path: sqlite3.Row in, models out."""
+    conn = get_db_connection()
+    try:
+        query = "SELECT * FROM messages WHERE 1=1"
+        total = conn.execute(f"SELECT COUNT(*) as cnt FROM ({query})").fetchone()['cnt']
+        rows = conn.execute(query + " ORDER BY ts ASC, message_id ASC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        results = [
+            MessageResponse(
+                message_id=row['message_id'],
+                from_=row['from_msisdn'],
+                to=row['to_msisdn'],
+                ts=row['ts'],
+                text=row['text']
+            ) for row in rows
+        ]
+        return results, total
+    finally:
+        conn.close()
+
+def models_path() -> bytes:
+    data, total = baseline_get_messages(LIMIT, 0)
+    model = MessageListResponse(data=data, total=total, limit=LIMIT, offset=0)
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+def fast_path() -> bytes:
+    rows, total = get_message_rows(LIMIT, 0, None, None, None)
+    return Response(content=render_message_list(rows, total, LIMIT, 0), media_type="application/json").body
+
+def measure(name, fn):
+    fn()  # warm up
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        fn()
+    cpu_us_per_row = (time.process_time() - start) / (ITERATIONS * LIMIT) * 1e6
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {cpu_us_per_row:8.2f} us/row   peak {peak / LIMIT:8.0f} B/row")
+    return cpu_us_per_row
+
+def main():
+    init_db()
+    seed(1000)
+    assert models_path() == fast_path(), "fast path output differs from the model path"
+
+    print(f"/messages serialization, limit={LIMIT}, {ITERATIONS} iterations (includes the SQLite query)")
+    before = measure("models", models_path)
+    after = measure("fast", fast_path)
+    print(f"speedup  {before / after:.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
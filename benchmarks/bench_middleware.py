@@ -0,0 +1,116 @@
+"""
+Compares in-process requests/second with the old BaseHTTPMiddleware request
+logger against app.middleware.RequestLoggingMiddleware, on /health/live and
+/webhook. Both variants serve the same routes from app.main.
+
+Run from the repo root:  python -m benchmarks.bench_middleware
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("WEBHOOK_SECRET", "bench")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+# Keep log output out of the measurement (both variants check the level the same way)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+import app.main
+from app.config import settings
+from app.metrics import metrics
+from app.middleware import RequestLoggingMiddleware
+from app.storage import init_db
+
+REQUESTS = 3000
+logger = app.main.logger
+
+async def legacy_log_requests(request: Request, call_next):
+    # The previous @app.middleware("http") implementation
+    request_id = str(uuid.uuid4())
+    request.state.request_id = request_id
+    start_time = time.time()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    except Exception as exc:
+        logger.error(f"Unhandled exception: {exc}")
+        status_code = 500
+        response = JSONResponse(content={"detail": "Internal Server Error"}, status_code=500)
+    duration = (time.time() - start_time) * 1000
+    metrics.inc_http_request(request.url.path, str(status_code))
+    metrics.observe_latency(duration)
+    extra = {
+        "request_id": request_id,
+        "method": request.method,
+        "path": request.url.path,
+        "status": status_code,
+        "latency_ms": round(duration, 3)
+    }
+    if hasattr(request.state, "webhook_log_extra"):
+        extra.update(request.state.webhook_log_extra)
+    logger.info("Request finished", extra=extra)
+    return response
+
+def build_app(legacy: bool) -> FastAPI:
+    variant = FastAPI()
+    variant.router.routes.extend(app.main.app.router.routes)
+    if legacy:
+        variant.middleware("http")(legacy_log_requests)
+    else:
+        variant.add_middleware(RequestLoggingMiddleware)
+    return variant
+
+def webhook_request(i: int, prefix: str):
+    body = json.dumps({
+        "message_id": f"{prefix}_{i}",
+        "from": "+15550001",
+        "to": "+15550002",
+        "ts": "2025-01-01T00:00:00Z",
+        "text": "benchmark",
+    }).encode()
+    sig = hmac.new(settings.WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return body, {"X-Signature": sig, "Content-Type": "application/json"}
+
+async def run(variant: FastAPI, name: str, path: str) -> float:
+    transport = httpx.ASGITransport(app=variant)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prefix = f"{name}_{uuid.uuid4().hex}"
+        if path == "/webhook":
+            payloads = [webhook_request(i, prefix) for i in range(REQUESTS)]
+        start = time.perf_counter()
+        for i in range(REQUESTS):
+            if path == "/webhook":
+                body, headers = payloads[i]
+                response = await client.post(path, content=body, headers=headers)
+            else:
+                response = await client.get(path)
+            assert response.status_code == 200, response.text
+        return REQUESTS / (time.perf_counter() - start)
+
+async def main_async():
+    init_db()
+    print(f"{REQUESTS} sequential in-process requests per run (httpx.ASGITransport)")
+    for path in ("/health/live", "/webhook"):
+        results = {}
+        for name, legacy in (("before", True), ("after", False)):
+            variant = build_app(legacy)
+            await run(variant, name + "_warmup", path)
+            results[name] = await run(variant, name, path)
+            print(f"{path:<14} {name:<7} {results[name]:9.0f} req/s")
+        print(f"{path:<14} change  {results['after'] / results['before']:9.2f}x")
+
+def main():
+    asyncio.run(main_async())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
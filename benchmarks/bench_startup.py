@@ -0,0 +1,144 @@
+"""
+Measures startup time (process start -> /health/ready 200) and
+time-to-first-request for the read endpoints, with WARMUP_ENABLED on and off.
+Each run starts a fresh uvicorn process against the same pre-populated DB.
+Before each run the DB files are evicted from the OS page cache with
+posix_fadvise(DONTNEED), so first requests start cold (--warm-cache skips
+this). The seeded thread in FIRST_REQUESTS is the most recent conversation,
+i.e. one warmup reads; /messages and /stats scan the whole table and are
+not helped by warmup.
+
+Run from the repo root:  python -m benchmarks.bench_startup [--messages N]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Indexed reads first: /messages and /stats scan the whole table and would
+# pull everything into the page cache for the requests after them
+FIRST_REQUESTS = [
+    "/conversations",
+    "/conversations/+15550000/+15559999",
+    "/stats/timeseries?bucket=hour",
+    "/messages?limit=100",
+    "/stats",
+]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def seed(env: dict, count: int, tmp: str):
+    path = os.path.join(tmp, "seed.ndjson")
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "message_id": f"seed_{i}",
+                "from": f"+1555{i % 5000:04d}",
+                "to": "+15559999",
+                "ts": f"2025-01-{1 + i % 28:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00Z",
+                "text": "Your verification code is %06d." % i,
+            }) + "\n")
+        # Make the benchmarked thread the most recent conversation
+        f.write(json.dumps({
+            "message_id": "seed_latest", "from": "+15550000", "to": "+15559999",
+            "ts": "2025-01-28T23:59:59Z", "text": "latest",
+        }) + "\n")
+    subprocess.run(
+        [sys.executable, "-m", "app.bulk_import", path, "--progress-every", "0"],
+        env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def drop_page_cache(db_path: str):
+    """Evicts the database files from the OS page cache."""
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if not os.path.exists(path):
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def get(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def run(env: dict, warmup: bool, cold: bool) -> dict:
+    if cold:
+        drop_page_cache(env["DATABASE_URL"].replace("sqlite:///", ""))
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(env, WARMUP_ENABLED="true" if warmup else "false")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                if get(base + "/health/ready") == 200:
+                    break
+            except OSError:
+                pass
+            if time.perf_counter() - start > 60:
+                raise RuntimeError("server did not become ready")
+            time.sleep(0.005)
+        result = {"startup_ms": (time.perf_counter() - start) * 1000}
+
+        for path in FIRST_REQUESTS:
+            request_start = time.perf_counter()
+            status = get(base + path)
+            assert status == 200, (path, status)
+            result[path] = (time.perf_counter() - request_start) * 1000
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warm-cache", action="store_true", help="don't drop the OS page cache before each run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            WEBHOOK_SECRET="bench",
+            DATABASE_URL="sqlite:///" + os.path.join(tmp, "bench.db"),
+            LOG_LEVEL="WARNING",
+        )
+        seed(env, args.messages, tmp)
+
+        cache = "warm" if args.warm_cache else "cold"
+        print(f"{args.messages} messages, {cache} OS page cache, best of {args.runs} runs, times in ms")
+        print(f"{'':<42} {'warmup off':>10} {'warmup on':>10}")
+        results = {
+            warmup: [run(env, warmup, not args.warm_cache) for _ in range(args.runs)]
+            for warmup in (False, True)
+        }
+        for key in ["startup_ms"] + FIRST_REQUESTS:
+            label = key if key == "startup_ms" else "first " + key
+            off = min(r[key] for r in results[False])
+            on = min(r[key] for r in results[True])
+            print(f"{label:<42} {off:10.1f} {on:10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import hashlib
+import hmac
+import json
+import pytest
+from app.config import settings
+from app.storage import init_db
+
+@pytest.fixture
+def isolated_db(tmp_path, monkeypatch):
+    """A fresh database for tests that assert exact counts, so reruns against a shared DB still pass."""
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    init_db()
+
+def post_message(client, message_id, from_="+222222001", to="+222222", ts="2025-01-01T10:00:00Z", text="Hi"):
+    """POSTs a correctly signed webhook and returns the response."""
+    body = json.dumps({"message_id": message_id, "from": from_, "to": to, "ts": ts, "text": text}).encode()
+    signature = hmac.new(settings.WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature, "Content-Type": "application/json"}
+    )
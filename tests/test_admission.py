@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import app.main
+from app.main import app as fastapi_app
+from app.admission import AdmissionController, Rejected
+from tests.conftest import post_message
+
+client = TestClient(fastapi_app)
+
+def test_webhook_throttled_per_sender(monkeypatch):
+    limited = AdmissionController(rate=0.01, burst=2, max_senders=100, max_concurrency=2, max_queue=8, retry_after=1)
+    monkeypatch.setattr(app.main, "admission", limited)
+
+    assert post_message(client, "m_rl_1", "+333000001").status_code == 200
+    assert post_message(client, "m_rl_2", "+333000001").status_code == 200
+
+    response = post_message(client, "m_rl_3", "+333000001")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Other senders are unaffected
+    assert post_message(client, "m_rl_4", "+333000002").status_code == 200
+
+    assert 'webhook_requests_total{result="throttled"}' in client.get("/metrics").text
+
+def test_write_path_sheds_when_queue_full():
+    controller = AdmissionController(rate=0, burst=0, max_senders=1, max_concurrency=1, max_queue=1, retry_after=3)
+
+    async def scenario():
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+
+        with pytest.raises(Rejected) as exc_info:
+            await controller.acquire()
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.result == "shed"
+        assert exc_info.value.retry_after == 3
+
+        # Releasing hands the slot to the waiter
+        controller.release()
+        await waiter
+        assert controller.in_flight == 1 and controller.queue_depth == 0
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
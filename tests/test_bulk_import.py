@@ -0,0 +1,54 @@
+import gzip
+import io
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.bulk_import import import_files, main
+
+client = TestClient(app)
+
+def write_ndjson(path, rows):
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+def test_ndjson_import_is_idempotent(tmp_path, isolated_db):
+    path = tmp_path / "backfill.ndjson"
+    write_ndjson(path, [
+        json.dumps({"message_id": "bulk_1", "from": "+444000001", "to": "+222222", "ts": "2024-06-01T10:00:00Z", "text": "one"}),
+        json.dumps({"message_id": "bulk_2", "from": "+444000001", "to": "+222222", "ts": "2024-06-01T10:05:00Z"}),
+        # Duplicate within the file
+        json.dumps({"message_id": "bulk_1", "from": "+444000001", "to": "+222222", "ts": "2024-06-01T10:00:00Z", "text": "one"}),
+        json.dumps({"message_id": "bulk_3", "from": "444", "to": "+222222", "ts": "2024-06-01T10:00:00Z"}),
+        "{not json",
+    ])
+
+    out = io.StringIO()
+    stats = import_files([str(path)], batch_size=2, out=out)
+    assert stats.summary()["read"] == 5
+    assert (stats.inserted, stats.duplicates, stats.invalid) == (2, 1, 2)
+    assert "backfill.ndjson:4: from:" in out.getvalue()
+
+    stats = import_files([str(path)], out=io.StringIO())
+    assert (stats.inserted, stats.duplicates, stats.invalid) == (0, 3, 2)
+
+    data = client.get("/messages?from=%2B444000001").json()
+    assert [m["message_id"] for m in data["data"]] == ["bulk_1", "bulk_2"]
+    assert data["data"][1]["text"] is None
+
+    # Rollups are maintained by the loader too
+    series = client.get("/stats/timeseries?bucket=hour&from=%2B444000001").json()
+    assert series["data"] == [{"bucket_start": "2024-06-01T10:00:00Z", "count": 2}]
+
+def test_csv_gzip_import(tmp_path, capsys, isolated_db):
+    path = tmp_path / "archive.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        f.write("message_id,from,to,ts,text\n")
+        f.write('bulk_csv_1,+444000002,+222222,2024-06-02T10:00:00Z,"hello, world"\n')
+        f.write("bulk_csv_2,+444000002,+222222,2024-06-02T11:00:00Z,\n")
+
+    assert main([str(path), "--progress-every", "0"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["inserted"] == 2 and summary["invalid"] == 0
+
+    data = client.get("/messages?from=%2B444000002").json()["data"]
+    assert data[0]["text"] == "hello, world"
+    assert data[1]["text"] is None
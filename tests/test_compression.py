@@ -0,0 +1,76 @@
+import asyncio
+import os
+from fastapi import Request
+from fastapi.testclient import TestClient
+from app.main import app
+from app.compression import encoded_response, negotiate_encoding
+from app.metrics import metrics
+from tests.conftest import post_message
+
+client = TestClient(app)
+
+def seed_message(msg_id, text):
+    post_message(client, msg_id, "+555000111", ts="2025-02-01T10:00:00Z", text=text)
+def test_negotiate_encoding():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("*") is not None
+
+def test_messages_gzip_and_etag():
+    seed_message("m_gzip_1", "Your code is 123456. " * 150)
+
+    response = client.get("/messages?from=%2B555000111", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()["data"][0]["message_id"] == "m_gzip_1"
+
+    etag = response.headers["etag"]
+    sent = metrics.compression_responses_total["gzip"]
+    response = client.get("/messages?from=%2B555000111", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # A 304 sends no body, so nothing is compressed or counted
+    assert metrics.compression_responses_total["gzip"] == sent
+
+    response = client.get("/messages?from=%2B555000111", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+def test_incompressible_body_304_keeps_identity_etag():
+    body = os.urandom(4096)
+
+    def respond(headers):
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+        return asyncio.run(encoded_response(Request(scope), body, "application/octet-stream"))
+
+    sent = metrics.compression_responses_total["gzip"]
+    response = respond({"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    # Not counted as a compressed response (nor negative bytes saved)
+    assert metrics.compression_responses_total["gzip"] == sent
+
+    not_modified = respond({"accept-encoding": "gzip", "if-none-match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == response.headers["etag"]
+
+def test_dashboard_precompressed():
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.headers["content-encoding"] == "gzip"
+    assert "max-age" in response.headers["cache-control"]
+    assert "<!DOCTYPE html>" in response.text
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert "max-age" in response.headers["cache-control"]
+
+def test_compression_metrics():
+    client.get("/", headers={"Accept-Encoding": "gzip"})
+    output = client.get("/metrics").text
+    assert 'compression_bytes_saved_total{encoding="gzip"}' in output
@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from tests.conftest import post_message
+
+client = TestClient(app)
+
+def seed_message(msg_id, from_num, to_num, ts):
+    post_message(client, msg_id, from_num, to_num, ts, f"text of {msg_id}")
+def test_conversation_thread_both_directions():
+    seed_message("m_conv_1", "+900000001", "+900000002", "2025-05-01T10:00:00Z")
+    seed_message("m_conv_2", "+900000002", "+900000001", "2025-05-01T10:01:00Z")
+    seed_message("m_conv_3", "+900000001", "+900000002", "2025-05-01T10:02:00Z")
+    # Other conversation of the same sender
+    seed_message("m_conv_4", "+900000001", "+900000003", "2025-05-01T10:03:00Z")
+
+    response = client.get("/conversations/+900000002/+900000001?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert [m["message_id"] for m in page["data"]] == ["m_conv_1", "m_conv_2"]
+    assert page["data"][1]["from"] == "+900000002"
+    assert page["next_cursor"]
+
+    page = client.get(f"/conversations/+900000001/+900000002?limit=2&cursor={page['next_cursor']}").json()
+    assert [m["message_id"] for m in page["data"]] == ["m_conv_3"]
+    assert page["next_cursor"] is None
+
+def test_recent_conversations():
+    seed_message("m_recent_1", "+910000001", "+910000002", "2099-01-01T10:00:00Z")
+    seed_message("m_recent_2", "+910000002", "+910000001", "2099-01-01T11:00:00Z")
+    seed_message("m_recent_3", "+910000003", "+910000001", "2099-01-01T10:30:00Z")
+    # Older message arriving late doesn't move the last-message pointer
+    seed_message("m_recent_4", "+910000001", "+910000002", "2099-01-01T09:00:00Z")
+
+    page = client.get("/conversations?limit=1").json()
+    assert page["data"] == [{
+        "participant_a": "+910000001",
+        "participant_b": "+910000002",
+        "last_message_id": "m_recent_2",
+        "last_ts": "2099-01-01T11:00:00Z",
+        "message_count": 3,
+    }]
+
+    page = client.get(f"/conversations?limit=1&cursor={page['next_cursor']}").json()
+    assert page["data"][0]["last_message_id"] == "m_recent_3"
+
+    # A page that ends exactly at the last conversation has no next page
+    count = len(client.get("/conversations?limit=100").json()["data"])
+    page = client.get(f"/conversations?limit={count}").json()
+    assert len(page["data"]) == count
+    assert page["next_cursor"] is None
+
+def test_invalid_cursor():
+    assert client.get("/conversations?cursor=not-a-cursor").status_code == 400
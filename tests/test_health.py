@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.health import health
+from app.lifecycle import lifecycle
+
+@pytest.fixture
+def client(monkeypatch):
+    # Lifespan startup/shutdown changes the process-wide lifecycle state; restore it afterwards
+    monkeypatch.setattr(lifecycle, "state", lifecycle.state)
+    with TestClient(app) as client:
+        yield client
+
+def test_ready_served_from_background_check(client):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    first = response.json()["checked_at"]
+
+    # Cached: a second probe doesn't re-run the checks
+    assert client.get("/health/ready").json()["checked_at"] == first
+
+    output = client.get("/metrics").text
+    assert 'health_probe_latency_ms{probe="write_lock"}' in output
+    assert 'health_probe_ok{probe="select"} 1' in output
+
+def test_ready_fails_on_failing_probe(client, monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_MIN_FREE_BYTES", 1 << 62)
+    asyncio.run(health.refresh())
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "failing probes: disk_free"
+
+    monkeypatch.setattr(settings, "HEALTH_MIN_FREE_BYTES", 0)
+    asyncio.run(health.refresh())
+    assert client.get("/health/ready").status_code == 200
+
+def test_ready_fails_when_stale(client, monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_MAX_STALENESS_S", -1.0)
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "health check stale"
@@ -0,0 +1,114 @@
+import asyncio
+import signal
+import socket
+import threading
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import app.main as main_module
+from app.main import app
+from app.config import settings
+from app.admission import Rejected
+from app.lifecycle import lifecycle
+from app.serve import build_server
+from app.storage import insert_message
+from tests.conftest import post_message
+
+def wait_for(condition, message, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail(message)
+        time.sleep(0.01)
+
+@pytest.fixture(autouse=True)
+def restore_state(monkeypatch):
+    monkeypatch.setattr(lifecycle, "state", lifecycle.state)
+
+def test_startup_warms_up_then_reports_ready():
+    with TestClient(app) as client:
+        assert lifecycle.ready
+        assert lifecycle.startup_ms is not None
+        assert app.openapi_schema is not None
+        assert client.get("/health/ready").status_code == 200
+    assert lifecycle.state == "stopped"
+
+def test_not_ready_before_startup():
+    lifecycle.state = "starting"
+    response = TestClient(app).get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "starting"
+
+def test_webhooks_rejected_while_draining():
+    client = TestClient(app)
+    lifecycle.state = "draining"
+
+    response = post_message(client, "m_drain_1")
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert 'webhook_requests_total{result="draining"}' in client.get("/metrics").text
+
+def test_shutdown_waits_for_in_flight_writes(monkeypatch):
+    monkeypatch.setattr(settings, "SHUTDOWN_DRAIN_TIMEOUT_S", 5.0)
+    finished = []
+
+    async def scenario():
+        lifecycle.state = "ready"
+
+        async def slow_write():
+            with lifecycle.write_guard():
+                await asyncio.sleep(0.05)
+                finished.append(True)
+
+        writer = asyncio.create_task(slow_write())
+        await asyncio.sleep(0)
+        await lifecycle.shutdown()
+        # Drain returned only after the write completed
+        assert finished == [True]
+        await writer
+
+    asyncio.run(scenario())
+    assert lifecycle.state == "stopped"
+
+def test_signal_drains_server_before_lifespan_shutdown(monkeypatch):
+    def slow_insert(msg):
+        time.sleep(0.5)
+        return insert_message(msg)
+    monkeypatch.setattr(main_module, "insert_message", slow_insert)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = build_server("127.0.0.1", port, log_level="warning")
+    assert server.config.timeout_graceful_shutdown == settings.SHUTDOWN_DRAIN_TIMEOUT_S
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}")
+    try:
+        wait_for(lambda: server.started, "server did not start")
+
+        responses = []
+        writer = threading.Thread(target=lambda: responses.append(post_message(client, "m_drain_server_1")), daemon=True)
+        writer.start()
+        wait_for(lambda: lifecycle.writes_in_flight or responses, "webhook never reached the write path")
+        assert not responses, f"webhook finished early with {responses[0].status_code}"
+
+        # The signal, not the lifespan, starts the drain
+        server.handle_exit(signal.SIGTERM, None)
+        assert lifecycle.state == "draining"
+        with pytest.raises(Rejected):
+            with lifecycle.write_guard():
+                pass
+
+        writer.join(timeout=10)
+        server_thread.join(timeout=10)
+        assert not server_thread.is_alive(), "server did not shut down"
+    finally:
+        # Never leave a server running if an assertion failed
+        server.should_exit = True
+        client.close()
+
+    # The in-flight write finished before the server shut down
+    assert responses[0].status_code == 200
+    assert lifecycle.state == "stopped"
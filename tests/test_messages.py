@@ -46,3 +46,21 @@ def test_messages_filter():
     data = response.json()
     assert len(data["data"]) >= 1
     assert data["data"][0]["text"] == "UniqueWord"
+
+def test_messages_fast_path_matches_model_serialization():
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.models import MessageListResponse, MessageResponse
+    from app.storage import get_message_rows
+
+    seed_message("m_fast_1", "2025-01-04T10:00:00Z", 'Quotes " and \\ backslash, ünïcödé ✓ and\nnewline')
+    seed_message("m_fast_2", "2025-01-04T11:00:00Z", None)
+
+    response = client.get("/messages?since=2025-01-04T00:00:00Z&limit=100")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    rows, total = get_message_rows(100, 0, None, "2025-01-04T00:00:00Z", None)
+    data = [MessageResponse(message_id=row[0], from_=row[1], to=row[2], ts=row[3], text=row[4]) for row in rows]
+    expected = JSONResponse(content=jsonable_encoder(MessageListResponse(data=data, total=total, limit=100, offset=0)))
+    assert response.content == expected.body
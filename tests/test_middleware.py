@@ -0,0 +1,46 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware import RequestLoggingMiddleware
+
+client = TestClient(app)
+
+def test_request_id_generated():
+    first = client.get("/health/live").headers["x-request-id"]
+    second = client.get("/health/live").headers["x-request-id"]
+    assert first and second and first != second
+
+def test_request_id_honoured():
+    response = client.get("/health/live", headers={"X-Request-ID": "edge-abc.123"})
+    assert response.headers["x-request-id"] == "edge-abc.123"
+
+    # Unsafe ids are replaced rather than echoed
+    response = client.get("/health/live", headers={"X-Request-ID": "bad id\t<script>"})
+    assert response.headers["x-request-id"] != "bad id\t<script>"
+
+def test_request_metrics_recorded():
+    client.get("/health/live")
+    output = client.get("/metrics").text
+    assert 'http_requests_total{path="/health/live",status="200"}' in output
+
+def test_request_metrics_use_route_template():
+    client.get("/conversations/+15550001/+15550002")
+    client.get("/conversations/+15550003/+15550004")
+    client.get("/no/such/path")
+    output = client.get("/metrics").text
+    assert 'http_requests_total{path="/conversations/{a}/{b}",status="200"}' in output
+    assert "+15550001" not in output
+    assert 'http_requests_total{path="unmatched",status="404"}' in output
+
+def test_unhandled_exception_returns_500():
+    failing_app = FastAPI()
+
+    @failing_app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    failing_app.add_middleware(RequestLoggingMiddleware)
+    response = TestClient(failing_app).get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal Server Error"}
+    assert response.headers["x-request-id"]
@@ -0,0 +1,83 @@
+import time
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+import app.main
+from app.main import app as fastapi_app
+from app.config import settings
+from app.profiling import ProfilingMiddleware, RequestProfiler
+
+client = TestClient(fastapi_app)
+
+def threadpool_busy_work():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+def test_profiler_samples_one_in_n():
+    profiler = RequestProfiler(sample_rate=2, interval_ms=1)
+    sample_app = FastAPI()
+
+    @sample_app.get("/work")
+    async def work():
+        threadpool_busy_work()
+        return {}
+
+    sample_app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    sample_client = TestClient(sample_app)
+    for _ in range(4):
+        assert sample_client.get("/work").status_code == 200
+
+    assert profiler.samples == 2
+    assert "samples: 2" in profiler.top(10)
+    assert ";" in profiler.collapsed()
+
+    profiler.reset()
+    assert profiler.samples == 0
+
+def test_profiler_sees_threadpool_work():
+    profiler = RequestProfiler(sample_rate=1, interval_ms=1)
+    sample_app = FastAPI()
+
+    @sample_app.get("/blocking")
+    async def blocking():
+        await run_in_threadpool(threadpool_busy_work)
+        return {}
+
+    sample_app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    assert TestClient(sample_app).get("/blocking").status_code == 200
+
+    busy_stacks = [line for line in profiler.collapsed().splitlines() if "(threadpool_busy_work)" in line]
+    assert busy_stacks
+    # Full stacks, rooted at the worker thread
+    assert busy_stacks[0].startswith("threading.py:")
+    assert "threadpool_busy_work" in profiler.top(50)
+
+def test_admin_endpoints_require_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    assert client.get("/admin/tracemalloc").status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/tracemalloc").status_code == 401
+    assert client.get("/admin/tracemalloc", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    headers = {"X-Admin-Token": "s3cret"}
+    assert client.post("/admin/tracemalloc/start", headers=headers).status_code == 200
+    try:
+        response = client.get("/admin/tracemalloc?limit=5", headers=headers)
+        assert response.status_code == 200
+        assert response.text.startswith("traced:")
+    finally:
+        client.post("/admin/tracemalloc/stop", headers=headers)
+
+def test_admin_profile(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+
+    monkeypatch.setattr(app.main, "profiler", RequestProfiler(sample_rate=0))
+    assert client.get("/admin/profile", headers=headers).status_code == 404
+
+    monkeypatch.setattr(app.main, "profiler", RequestProfiler(sample_rate=1))
+    response = client.get("/admin/profile", headers=headers)
+    assert response.status_code == 200
+    assert response.text == "no samples yet\n"
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+import app.main
+from app.main import app as fastapi_app
+from app.storage import QueryBudget, QueryCancelled, read_connection
+
+client = TestClient(fastapi_app)
+
+SLOW_QUERY = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000)
+    SELECT COUNT(*) FROM n
+"""
+
+def test_budget_interrupts_slow_query():
+    with pytest.raises(QueryCancelled) as exc_info:
+        with read_connection(QueryBudget(50)) as conn:
+            conn.execute(SLOW_QUERY).fetchone()
+    assert exc_info.value.reason == "timeout"
+
+def test_cancel_interrupts_query():
+    budget = QueryBudget(0)
+    budget.cancel()
+    with pytest.raises(QueryCancelled) as exc_info:
+        with read_connection(budget) as conn:
+            conn.execute(SLOW_QUERY).fetchone()
+    assert exc_info.value.reason == "disconnected"
+
+def test_stats_timeout_returns_504(monkeypatch):
+    def slow_stats(budget=None):
+        with read_connection(budget) as conn:
+            conn.execute(SLOW_QUERY).fetchone()
+
+    monkeypatch.setattr(app.main.settings, "QUERY_BUDGET_STATS_MS", 50)
+    monkeypatch.setattr(app.main, "db_get_stats", slow_stats)
+
+    response = client.get("/stats")
+    assert response.status_code == 504
+    assert response.json() == {"detail": "query time budget exceeded"}
+    assert 'query_cancelled_total{endpoint="/stats",reason="timeout"}' in client.get("/metrics").text
+
+def test_client_disconnect_cancels_query(monkeypatch):
+    import asyncio
+
+    def slow_stats(budget=None):
+        with read_connection(budget) as conn:
+            conn.execute(SLOW_QUERY).fetchone()
+
+    monkeypatch.setattr(app.main.settings, "QUERY_BUDGET_STATS_MS", 0)
+    monkeypatch.setattr(app.main, "db_get_stats", slow_stats)
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/stats", "raw_path": b"/stats",
+        "root_path": "", "query_string": b"", "headers": [], "server": ("test", 80), "client": ("test", 1),
+    }
+    asyncio.run(asyncio.wait_for(fastapi_app(scope, receive, send), 10))
+
+    assert sent[0]["status"] == 503
+    assert 'query_cancelled_total{endpoint="/stats",reason="disconnected"}' in client.get("/metrics").text
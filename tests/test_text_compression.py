@@ -0,0 +1,84 @@
+import json
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.storage import get_db_connection
+from app import text_codec
+from app.text_codec import codec
+from tests.conftest import post_message
+
+zstandard = pytest.importorskip("zstandard")
+
+from app.text_compression import main
+
+client = TestClient(app)
+
+def seed_message(msg_id, text):
+    post_message(client, msg_id, "+666000001", ts="2025-04-01T10:00:00Z", text=text)
+def stored_text(msg_id):
+    conn = get_db_connection()
+    try:
+        return tuple(conn.execute("SELECT text, text_z FROM messages WHERE message_id = ?", (msg_id,)).fetchone())
+    finally:
+        conn.close()
+
+@pytest.fixture
+def fresh_codec(isolated_db, monkeypatch):
+    # Dictionary ids restart at 1 in a new database; drop any cached ones
+    monkeypatch.setattr(codec, "_dicts", {})
+    monkeypatch.setattr(codec, "_latest_id", None)
+    monkeypatch.setattr(codec, "_refreshed_at", 0.0)
+    monkeypatch.setattr(codec, "_local", threading.local())
+
+def test_compressed_text_round_trip(monkeypatch, capsys, fresh_codec):
+    for i in range(300):
+        seed_message(f"m_zstd_{i}", f"Your order #{i * 7919} has shipped and will arrive on Monday. Track it in the app.")
+
+    assert main(["train", "--samples", "300", "--dict-size", "4096"]) == 0
+    assert json.loads(capsys.readouterr().out)["samples"] >= 300
+
+    # New rows are written compressed once enabled
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION", True)
+    seed_message("m_zstd_new", "Your order #424242 has shipped and will arrive on Monday. Track it in the app.")
+    text, text_z = stored_text("m_zstd_new")
+    assert text is None and text_z is not None
+
+    # Existing rows are converted by the compress command
+    assert main(["compress"]) == 0
+    assert json.loads(capsys.readouterr().out)["converted"] >= 300
+    assert stored_text("m_zstd_0")[0] is None
+
+    # Reads and text search see the original text
+    data = client.get("/messages?q=424242").json()["data"]
+    assert [m["message_id"] for m in data] == ["m_zstd_new"]
+    assert data[0]["text"] == "Your order #424242 has shipped and will arrive on Monday. Track it in the app."
+
+    assert main(["report", "--scan-sample", "1000"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["compressed_rows"] >= 301
+    assert report["sample_db_bytes_compressed"] < report["sample_db_bytes_plain"]
+
+    # Reverting restores plain text
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION", False)
+    assert main(["decompress"]) == 0
+    capsys.readouterr()
+    assert stored_text("m_zstd_new")[0].startswith("Your order #424242")
+
+def test_startup_check_without_zstandard(monkeypatch, isolated_db):
+    monkeypatch.setattr(text_codec, "zstandard", None)
+    conn = get_db_connection()
+    try:
+        codec.check(conn)
+
+        monkeypatch.setattr(settings, "TEXT_COMPRESSION", True)
+        with pytest.raises(RuntimeError, match="TEXT_COMPRESSION"):
+            codec.check(conn)
+
+        monkeypatch.setattr(settings, "TEXT_COMPRESSION", False)
+        conn.execute("INSERT INTO text_dictionaries (created_at, sample_count, dict_data) VALUES ('', 0, x'00')")
+        with pytest.raises(RuntimeError, match="dictionaries exist"):
+            codec.check(conn)
+    finally:
+        conn.close()
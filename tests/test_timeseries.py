@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.storage import backfill_rollups, get_db_connection, init_db
+from tests.conftest import post_message
+
+client = TestClient(app)
+
+def seed_message(msg_id, from_num, ts):
+    return post_message(client, msg_id, from_num, ts=ts)
+def test_timeseries_buckets():
+    seed_message("m_ts_1", "+777000001", "2024-03-05T10:15:00Z")
+    seed_message("m_ts_2", "+777000001", "2024-03-05T10:45:30Z")
+    seed_message("m_ts_3", "+777000001", "2024-03-05T11:05:00Z")
+    # Duplicate must not be counted twice
+    seed_message("m_ts_3", "+777000001", "2024-03-05T11:05:00Z")
+
+    response = client.get("/stats/timeseries?bucket=hour&from=%2B777000001")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["bucket"] == "hour"
+    assert data["from"] == "+777000001"
+    assert data["data"] == [
+        {"bucket_start": "2024-03-05T10:00:00Z", "count": 2},
+        {"bucket_start": "2024-03-05T11:00:00Z", "count": 1},
+    ]
+
+    response = client.get("/stats/timeseries?bucket=minute&from=%2B777000001&since=2024-03-05T10:45:59Z&until=2024-03-05T10:59:00Z")
+    assert response.json()["data"] == [{"bucket_start": "2024-03-05T10:45:00Z", "count": 1}]
+
+    response = client.get("/stats/timeseries?bucket=day&since=2024-03-05T00:00:00Z&until=2024-03-05T23:59:59Z")
+    assert response.json()["data"][0]["count"] >= 3
+
+def test_timeseries_invalid_bucket():
+    response = client.get("/stats/timeseries?bucket=week")
+    assert response.status_code == 422
+
+def test_malformed_timestamps_rejected():
+    for i, ts in enumerate(["20250115T100000Z", "2025-01-15T10Z", "garbageZ", "2025-13-01T10:00:00Z"]):
+        assert seed_message(f"m_ts_bad_{i}", "+777000002", ts).status_code == 422
+
+    for query in ["since=abc", "until=2024-03-05", "since=2024-03-05T10:00:00+01:00"]:
+        assert client.get(f"/stats/timeseries?{query}").status_code == 422
+
+def test_backfill_normalises_buckets(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'backfill.db'}")
+    init_db()
+    conn = get_db_connection()
+    try:
+        # Rows written before ts was validated, bypassing the rollups
+        conn.executemany(
+            "INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, created_at) VALUES (?, '+1', '+2', ?, '')",
+            [("a", "2024-03-05T10:15:00.250Z"), ("b", "2024-03-05T10:45:00Z"), ("c", "garbageZ")]
+        )
+        backfill_rollups(conn)
+        rows = conn.execute("SELECT bucket_start, count FROM message_rollups_hour WHERE from_msisdn = ''").fetchall()
+    finally:
+        conn.close()
+    assert [tuple(row) for row in rows] == [("2024-03-05T10:00:00Z", 2)]